@@ -46,13 +46,16 @@ WORKFLOW:
 4. BalanceAgent.invoke() processes the query:
    - Validates OpenAI API key
    - Invokes LangGraph agent with user query
-   - Agent uses tools to fetch balance data (currently stubbed)
+   - Agent uses tools to fetch balance data; tool calls issued in the same
+     step run concurrently and share one Bitquery request per address
    - Extracts assistant response from agent result
 5. Response is formatted as JSON and sent back via EventQueue
 
 KEY COMPONENTS:
 ---------------
 - BalanceAgent: Core agent class that wraps LangGraph agent and ADK Runner
+  (one shared instance per app lifespan via get_balance_agent(); the in-memory ADK
+  services are process-wide)
 - BalanceAgentExecutor: Implements A2A AgentExecutor interface
 - Tools: get_balance() and get_token_balance() for blockchain queries
 - create_server(): Factory function to create A2A server (standalone or mounted)
@@ -65,6 +68,10 @@ ENVIRONMENT VARIABLES:
 - ITINERARY_PORT: Optional - Server port (default: 9001)
 - RENDER_EXTERNAL_URL: Optional - External URL for agent card
 - CRONOS_NETWORK: Optional - Network to use (default: "mainnet")
+- BITQUERY_CACHE_TTL: Optional - Seconds to cache balance lookups per address (default: 10)
+- BALANCE_AGENT_CONCURRENCY: Optional - Max agent runs in flight at once (default: 8)
+- BALANCE_RESPONSE_CACHE_TTL: Optional - Seconds to reuse repeated answers (default: 10, 0 disables)
+- BALANCE_MAX_TASKS: Optional - Max A2A tasks kept in memory before evicting (default: 10000)
 
 USAGE:
 ------
@@ -84,17 +91,27 @@ NOTES:
 - Error handling includes user-friendly messages for common issues
 - Supports streaming responses via AgentCapabilities
 - Bitquery API supports both v1 and v2 tokens (auto-detected)
+- Tools are async end to end (aiohttp, no sync HTTP clients); the only CPU-heavy
+  step, formatting very large wallets, runs in a worker thread
 """
 
 import os
-import uuid
-import json
+import re
+import hashlib
+import time
+import asyncio
+import logging
 import pathlib
+from collections import OrderedDict
 from decimal import Decimal
-from typing import Any, List, Dict, Optional
+from functools import lru_cache
+from typing import Any, List, Dict, Optional, Tuple
 
+import aiohttp
+import httpx
+import orjson
 import uvicorn
-import requests
+from cachetools import TTLCache
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -118,22 +135,37 @@ from a2a.types import (
     Message,
     Part,
     Role,
+    Task,
     TextPart,
 )
 from google.adk.artifacts import InMemoryArtifactService
 from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
 from google.adk.runners import Runner
 from google.adk.sessions import InMemorySessionService
+from langchain_core.messages import AIMessage, ToolMessage
 from langchain_core.tools import tool
 from langchain_openai import ChatOpenAI
 from langchain.agents import create_agent
 
+logger = logging.getLogger(__name__)
+
 # Constants
 DEFAULT_PORT = 9001
 DEFAULT_NETWORK = "ethereum"
 DEFAULT_MODEL = "gpt-4o-mini"
 DEFAULT_TEMPERATURE = 0
 DEFAULT_SESSION_ID = "default_session"
+DEFAULT_AGENT_CONCURRENCY = 8
+DEFAULT_RESPONSE_CACHE_TTL = 10  # seconds, matches the balance snapshot TTL
+RESPONSE_CACHE_MAXSIZE = 1024
+DEFAULT_MAX_TASKS = 10_000
+DEFAULT_BITQUERY_CACHE_TTL = 10  # seconds, roughly Bitquery's indexing cadence
+BITQUERY_CACHE_MAXSIZE = 4096
+BITQUERY_UNAVAILABLE_MESSAGE = (
+    "Bitquery is temporarily unavailable after repeated failures. Please try again shortly."
+)
+STALE_BALANCE_NOTE = "Balances could not be refreshed just now; showing the last known values."
+TOOL_ERROR_PREFIX = "Error fetching Cronos balance: "
 EMPTY_RESPONSE_MESSAGE = (
     "I apologize, but I couldn't generate a response. Please try rephrasing your question."
 )
@@ -145,17 +177,36 @@ ENV_OPENAI_API_KEY = "OPENAI_API_KEY"
 ENV_OPENAI_MODEL = "OPENAI_MODEL"
 ENV_BITQUERY_API_KEY = "BITQUERY_API_KEY"
 ENV_CRONOS_NETWORK = "CRONOS_NETWORK"
+ENV_BITQUERY_CACHE_TTL = "BITQUERY_CACHE_TTL"
+ENV_BALANCE_AGENT_CONCURRENCY = "BALANCE_AGENT_CONCURRENCY"
+ENV_BALANCE_RESPONSE_CACHE_TTL = "BALANCE_RESPONSE_CACHE_TTL"
+ENV_BALANCE_MAX_TASKS = "BALANCE_MAX_TASKS"
+
+# OpenAI HTTP connection pool
+OPENAI_MAX_CONNECTIONS = 200
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = 100
 
 # Bitquery API endpoints
 BITQUERY_API_V1_URL = "https://graphql.bitquery.io"
 BITQUERY_API_V2_URL = "https://graphql.bitquery.io/v2"
-
-# GraphQL query to get user token balances using Bitquery API v2
-# This query fetches native CRO balance and all token balances for an address on Cronos
-GET_USER_BALANCES_QUERY = """
-query GetCronosBalances($address: String!) {
-  ethereum(network: cronos) {
-    address(address: {is: $address}) {
+BITQUERY_REQUEST_TIMEOUT = 30
+BITQUERY_CONNECT_TIMEOUT = 3
+BITQUERY_READ_TIMEOUT = 15
+BITQUERY_POOL_SIZE = 100
+BITQUERY_KEEPALIVE_TIMEOUT = 60  # seconds an idle connection is kept open
+BITQUERY_MAX_RETRIES = 2
+BITQUERY_RETRY_BACKOFF = 0.2  # seconds, doubled on each retry
+BITQUERY_RETRY_STATUSES = frozenset({429, 502, 503, 504})
+BITQUERY_BREAKER_FAIL_MAX = 5  # consecutive failures before failing fast
+BITQUERY_BREAKER_RESET_TIMEOUT = 30  # seconds before a trial request is let through
+BITQUERY_STALE_TTL = 300  # seconds a last-known snapshot may be served on errors
+BITQUERY_BATCH_WINDOW = 0.005  # seconds to collect lookups before sending a batch
+BITQUERY_BATCH_MAX_SIZE = 25
+# Wallets with more balances than this are formatted off the event loop
+FORMAT_OFFLOAD_THRESHOLD = 64
+
+# Fields selected for each address: native CRO balance and all token balances
+BALANCE_FIELDS = """
       # Native coin balance (CRO)
       balance
       # Token balances (CRC-20)
@@ -167,12 +218,27 @@ query GetCronosBalances($address: String!) {
           address
         }
         value
-      }
+      }"""
+
+# GraphQL query to get user token balances using Bitquery API v2
+# This query fetches native CRO balance and all token balances for an address on Cronos
+GET_USER_BALANCES_QUERY = """
+query GetCronosBalances($address: String!) {
+  ethereum(network: cronos) {
+    address(address: {is: $address}) {""" + BALANCE_FIELDS + """
     }
   }
 }
 """
 
+# Single-address request body, JSON-encoded once. Per request only the address
+# placeholder is replaced, so the query text is never re-serialized.
+_ADDRESS_PLACEHOLDER = b"__ADDRESS__"
+_BALANCES_PAYLOAD_TEMPLATE = orjson.dumps({
+    "query": GET_USER_BALANCES_QUERY,
+    "variables": {"address": _ADDRESS_PLACEHOLDER.decode()},
+})
+
 # Message types
 MESSAGE_TYPE_AI = "ai"
 MESSAGE_ROLE_ASSISTANT = "assistant"
@@ -190,10 +256,13 @@ ERROR_AUTH_MESSAGE = "Authentication error: Please check your OpenAI API key con
 ERROR_TIMEOUT_MESSAGE = "Request timed out. Please try again."
 ERROR_GENERIC_PREFIX = "I encountered an error while processing your request: "
 
+# Group 1 matches the API key needle, group 2 the timeout needle
+ERROR_PATTERN = re.compile(
+    f"({re.escape(ERROR_API_KEY)})|({re.escape(ERROR_TIMEOUT)})", re.IGNORECASE
+)
 
-def get_system_prompt() -> str:
-    """Get the system prompt for the agent."""
-    return """You are a helpful Web3 assistant specializing in checking cryptocurrency balances.
+
+SYSTEM_PROMPT = """You are a helpful Web3 assistant specializing in checking cryptocurrency balances.
 
 When users ask about balances:
 1. Extract the wallet address:
@@ -208,6 +277,8 @@ When users ask about balances:
    - Default to "cronos" if not specified
 3. For token queries, identify the token symbol (USDC, USDT, DAI, CRO, etc.)
 4. Use the appropriate tool to fetch balance data
+   - When several tokens are requested (e.g. "my USDC and USDT"), call get_token_balance
+     for all of them in the same step instead of one after another
 5. Present results in a clear, user-friendly format
 
 Special handling for Cronos:
@@ -221,6 +292,11 @@ Address validation:
 - If there's an error, explain it clearly and suggest alternatives."""
 
 
+def get_system_prompt() -> str:
+    """Get the system prompt for the agent."""
+    return SYSTEM_PROMPT
+
+
 def get_port() -> int:
     """Get the port number from environment or default."""
     return int(os.getenv(ENV_ITINERARY_PORT, str(DEFAULT_PORT)))
@@ -231,8 +307,12 @@ def get_card_url(port: int) -> str:
     return os.getenv(ENV_RENDER_EXTERNAL_URL, f"http://localhost:{port}")
 
 
+@lru_cache(maxsize=1)
 def create_agent_skill() -> AgentSkill:
-    """Create the agent skill definition."""
+    """Create the agent skill definition.
+    
+    Built once per process; the returned instance is shared and must not be mutated.
+    """
     return AgentSkill(
         id="balance_agent",
         name="Balance Agent",
@@ -251,10 +331,16 @@ def create_agent_skill() -> AgentSkill:
     )
 
 
-def create_agent_card(port: int) -> AgentCard:
-    """Create the public agent card."""
-    card_url = get_card_url(port)
-    skill = create_agent_skill()
+# Shared by every agent card; AgentCard only references it
+AGENT_CAPABILITIES = AgentCapabilities(streaming=True)
+
+
+@lru_cache(maxsize=8)
+def get_agent_card(card_url: str) -> AgentCard:
+    """Get the public agent card served at the given URL.
+    
+    Built once per URL; the returned instance is shared and must not be mutated.
+    """
     return AgentCard(
         name="Balance Agent",
         description=(
@@ -265,12 +351,24 @@ def create_agent_card(port: int) -> AgentCard:
         version="2.0.0",
         default_input_modes=["text"],
         default_output_modes=["text"],
-        capabilities=AgentCapabilities(streaming=True),
-        skills=[skill],
+        capabilities=AGENT_CAPABILITIES,
+        skills=[create_agent_skill()],
         supports_authenticated_extended_card=False,
     )
 
 
+def create_agent_card(port: int) -> AgentCard:
+    """Create the public agent card.
+    
+    The card URL is resolved on every call; the card itself is shared per URL
+    (see get_agent_card) and must not be mutated.
+    """
+    return get_agent_card(get_card_url(port))
+
+
+ADDRESS_PATTERN = re.compile(r"0x[0-9a-fA-F]+")
+
+
 def validate_address(address: str) -> bool:
     """Validate Ethereum/Cronos address format.
     
@@ -280,14 +378,7 @@ def validate_address(address: str) -> bool:
     Returns:
         True if address is valid, False otherwise
     """
-    if not address.startswith("0x"):
-        return False
-    if len(address) < 3:
-        return False
-    hex_part = address[2:]
-    if not all(c in "0123456789abcdefABCDEF" for c in hex_part):
-        return False
-    return True
+    return ADDRESS_PATTERN.fullmatch(address) is not None
 
 
 def get_bitquery_api_key() -> str:
@@ -333,6 +424,131 @@ def get_bitquery_api_key() -> str:
     return api_key.strip()
 
 
+_http_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """Get the shared aiohttp session used for Bitquery requests.
+
+    The session is created lazily on first use (aiohttp needs a running event loop)
+    and reused afterwards. Its connector keeps idle connections alive, so only the
+    first request pays the TCP + TLS handshake to Bitquery.
+
+    Returns:
+        Shared aiohttp ClientSession
+    """
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        _http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=BITQUERY_POOL_SIZE,
+                keepalive_timeout=BITQUERY_KEEPALIVE_TIMEOUT,
+            ),
+            timeout=aiohttp.ClientTimeout(
+                total=BITQUERY_REQUEST_TIMEOUT,
+                connect=BITQUERY_CONNECT_TIMEOUT,
+                sock_read=BITQUERY_READ_TIMEOUT,
+            ),
+        )
+    return _http_session
+
+
+async def close_http_session() -> None:
+    """Close the shared aiohttp session. Called on application shutdown."""
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
+
+# Powers of ten for every realistic token decimals value (ERC-20 allows up to 36 in practice)
+_POW10 = tuple(10 ** i for i in range(37))
+
+
+def pow10(exponent: int) -> int:
+    """Return 10 ** exponent, served from a precomputed table for common values."""
+    if 0 <= exponent < len(_POW10):
+        return _POW10[exponent]
+    return 10 ** exponent
+
+
+@lru_cache(maxsize=1024)
+def cro_to_wei(amount: str) -> int:
+    """Convert a decimal CRO amount string to wei.
+    
+    Uses Decimal for precision with large numbers; scaleb shifts the exponent
+    instead of multiplying. Memoized because the same wallet balance string is
+    typically converted repeatedly within a session.
+    
+    Args:
+        amount: CRO amount as a decimal string (e.g. "24827.849010682339425216")
+        
+    Returns:
+        Amount in wei
+    """
+    return int(Decimal(amount).scaleb(18))
+
+
+@lru_cache(maxsize=1)
+def get_bitquery_endpoint() -> Tuple[str, Dict[str, str]]:
+    """Get the Bitquery API URL and request headers for the configured API key.
+    
+    The API key is fixed for the life of the process, so the version detection
+    and headers are computed on first use and reused. A missing key is not
+    cached, so the lookup is retried on the next call.
+    
+    Returns:
+        Tuple of API URL and headers (shared; must not be mutated)
+        
+    Raises:
+        ValueError: If no API key is found
+    """
+    api_key = get_bitquery_api_key()
+    
+    # Determine API version and set headers/URL accordingly
+    # API v2 tokens typically start with "ory_at_" and use Authorization header
+    # API v1 tokens use X-API-KEY header
+    is_v2_token = api_key.startswith("ory_at_") or api_key.startswith("Bearer ")
+    
+    headers = {
+        "Content-Type": "application/json",
+        "Accept": "application/json",
+    }
+    
+    if is_v2_token:
+        # API v2 uses Authorization header with Bearer token
+        if not api_key.startswith("Bearer "):
+            headers["Authorization"] = f"Bearer {api_key}"
+        else:
+            headers["Authorization"] = api_key
+        api_url = BITQUERY_API_V2_URL
+    else:
+        # API v1 uses X-API-KEY header
+        headers["X-API-KEY"] = api_key
+        api_url = BITQUERY_API_V1_URL
+    
+    return api_url, headers
+
+
+def _format_trimmed(value: float, precision: int) -> str:
+    """Format a number with up to `precision` decimals, without trailing zeros.
+    
+    Args:
+        value: Number to format
+        precision: Maximum number of decimal places
+        
+    Returns:
+        Formatted number string
+    """
+    formatted = f"{value:.{precision}f}"
+    if precision > 0:
+        # Strip zeros only from the fractional part ("100.000000" -> "100")
+        formatted = formatted.rstrip("0")
+        if formatted[-1] == ".":
+            formatted = formatted[:-1]
+    return formatted
+
+
 def format_balance(amount: str, decimals: int = 18) -> str:
     """Format balance from string amount to human-readable format.
     
@@ -357,19 +573,77 @@ def format_balance(amount: str, decimals: int = 18) -> str:
         
         # Convert from smallest unit to human-readable
         if decimals > 0:
-            balance = amount_int / (10 ** decimals)
+            balance = amount_int / pow10(decimals)
         else:
             balance = float(amount_int)
         
         # Return formatted with up to 6 decimal places, removing trailing zeros
-        formatted = f"{balance:.6f}".rstrip('0').rstrip('.')
-        return formatted if formatted else "0"
+        return _format_trimmed(balance, 6)
     except (ValueError, TypeError) as e:
         # If conversion fails, return the original value
         return str(amount)
 
 
-def fetch_cronos_balances(address: str) -> Dict[str, Any]:
+def get_bitquery_cache_ttl() -> float:
+    """Get the balance cache TTL in seconds from environment or default."""
+    return float(os.getenv(ENV_BITQUERY_CACHE_TTL, str(DEFAULT_BITQUERY_CACHE_TTL)))
+
+
+# Successful balance lookups keyed by lowercased address. Repeated questions
+# in a chat session ("my balance", then "my USDC") reuse the same snapshot.
+_balances_cache: TTLCache = TTLCache(maxsize=BITQUERY_CACHE_MAXSIZE, ttl=get_bitquery_cache_ttl())
+# Last successful lookups, kept longer than the cache and served only when a
+# refresh fails (stale-while-error)
+_stale_balances: TTLCache = TTLCache(maxsize=BITQUERY_CACHE_MAXSIZE, ttl=BITQUERY_STALE_TTL)
+# Fetches currently in flight, keyed like the cache. Concurrent misses for the same
+# address (e.g. parallel USDC and USDT lookups) await one shared upstream request.
+_inflight_fetches: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+
+
+async def fetch_cronos_balances(address: str) -> Dict[str, Any]:
+    """Fetch balances from Cronos, served from a short-lived cache when possible.
+    
+    Only successful lookups are cached; errors are always retried upstream.
+    
+    Args:
+        address: Wallet address to check
+        
+    Returns:
+        Dictionary with balance information
+    """
+    cache_key = address.lower()
+    cached = _balances_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
+    inflight = _inflight_fetches.get(cache_key)
+    if inflight is None:
+        inflight = asyncio.ensure_future(_fetch_and_cache_balances(cache_key, address))
+        _inflight_fetches[cache_key] = inflight
+        inflight.add_done_callback(lambda _: _inflight_fetches.pop(cache_key, None))
+    # Shield so a cancelled caller does not cancel the fetch other callers are awaiting
+    return await asyncio.shield(inflight)
+
+
+async def _fetch_and_cache_balances(cache_key: str, address: str) -> Dict[str, Any]:
+    """Fetch balances from Bitquery and memoize the result if it succeeded.
+    
+    If the fetch fails but a recent snapshot exists, that snapshot is returned
+    marked as ``stale`` instead of the error.
+    """
+    result = await _balance_batcher.fetch(address)
+    if result.get("success", False):
+        _balances_cache[cache_key] = result
+        _stale_balances[cache_key] = result
+        return result
+    stale = _stale_balances.get(cache_key)
+    if stale is not None:
+        logger.warning("Serving stale balances for %s: %s", address, result.get("error"))
+        return {**stale, "stale": True}
+    return result
+
+
+async def _fetch_cronos_balances_uncached(address: str) -> Dict[str, Any]:
     """Fetch balances from Cronos using Bitquery API.
     
     Fetches all tokens with balance > 0 from Bitquery.
@@ -384,268 +658,612 @@ def fetch_cronos_balances(address: str) -> Dict[str, Any]:
     try:
         # Validate address format
         if not validate_address(address):
-            return {
-                "success": False,
-                "error": f"Invalid address format: {address}. Address must start with 0x and contain valid hexadecimal characters.",
-            }
+            return _invalid_address_result(address)
         
-        # Get API key - catch ValueError if missing
-        try:
-            api_key = get_bitquery_api_key()
-        except ValueError as e:
+        # Safe to splice in unescaped: the address was validated as 0x + hex digits
+        payload = _BALANCES_PAYLOAD_TEMPLATE.replace(_ADDRESS_PLACEHOLDER, address.encode(), 1)
+        response = await _query_bitquery(payload)
+        if not response.get("success", False):
             return {
                 "address": address,
+                "error": response.get("error", "Unknown error"),
                 "success": False,
-                "error": str(e),
             }
         
-        variables = {
+        # Parse Bitquery API v2 response structure
+        ethereum_data = response["data"].get("data", {}).get("ethereum", {})
+        address_data = ethereum_data.get("address", [])
+        return _format_address_balances(address, address_data)
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        error_msg = f"Request error: {str(e)}"
+        logger.warning("Balance fetch request error for %s: %s", address, error_msg)
+        return {
             "address": address,
+            "error": error_msg,
+            "success": False,
         }
-        payload = {
-            "query": GET_USER_BALANCES_QUERY,
-            "variables": variables,
-        }
-        
-        # Determine API version and set headers/URL accordingly
-        # API v2 tokens typically start with "ory_at_" and use Authorization header
-        # API v1 tokens use X-API-KEY header
-        is_v2_token = api_key.startswith("ory_at_") or api_key.startswith("Bearer ")
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Accept": "application/json",
+    except Exception as e:
+        error_msg = f"Unexpected error: {str(e)}"
+        logger.exception("Balance fetch unexpected error for %s", address)
+        return {
+            "address": address,
+            "error": error_msg,
+            "success": False,
         }
+
+
+async def batch_fetch_cronos_balances(addresses: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch balances for several addresses with a single Bitquery request.
+    
+    Each address gets its own aliased ``ethereum`` root field (``a0``, ``a1``, ...)
+    in one GraphQL query, so N addresses cost one HTTP round-trip instead of N.
+    
+    Args:
+        addresses: Wallet addresses to check
         
-        if is_v2_token:
-            # API v2 uses Authorization header with Bearer token
-            if not api_key.startswith("Bearer "):
-                headers["Authorization"] = f"Bearer {api_key}"
-            else:
-                headers["Authorization"] = api_key
-            api_url = BITQUERY_API_V2_URL
+    Returns:
+        Dictionary mapping each requested address to its balance information
+        (same shape as fetch_cronos_balances)
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    valid_addresses: List[str] = []
+    for address in dict.fromkeys(addresses):
+        if validate_address(address):
+            valid_addresses.append(address)
         else:
-            # API v1 uses X-API-KEY header
-            headers["X-API-KEY"] = api_key
-            api_url = BITQUERY_API_V1_URL
-        
-        response = requests.post(
-            api_url,
-            json=payload,
-            headers=headers,
-            timeout=30,
-        )
+            results[address] = _invalid_address_result(address)
+    if not valid_addresses:
+        return results
+    
+    def fail_all(error_msg: str) -> Dict[str, Dict[str, Any]]:
+        for address in valid_addresses:
+            results[address] = {"address": address, "error": error_msg, "success": False}
+        return results
+    
+    try:
+        payload = orjson.dumps({
+            "query": build_batch_balances_query(len(valid_addresses)),
+            "variables": {f"a{i}": address for i, address in enumerate(valid_addresses)},
+        })
+        response = await _query_bitquery(payload, allow_partial=True)
+        if not response.get("success", False):
+            return fail_all(response.get("error", "Unknown error"))
         
-        if response.status_code == 401:
-            error_detail = "Unauthorized - Invalid API key. Please check your BITQUERY_API_KEY."
-            try:
-                error_data = response.json()
-                if "errors" in error_data:
-                    error_detail += f" Details: {json.dumps(error_data['errors'])}"
-                elif "message" in error_data:
-                    error_detail += f" Details: {error_data['message']}"
-            except:
-                error_detail += f" Response: {response.text[:200]}"
-            return {
-                "address": address,
-                "error": error_detail,
-                "success": False,
-            }
-        if response.status_code == 403:
-            error_detail = "Forbidden - The API endpoint may require authentication or have access restrictions."
-            try:
-                error_data = response.json()
-                if "errors" in error_data:
-                    error_detail += f" Details: {json.dumps(error_data['errors'])}"
-            except:
-                error_detail += f" Response: {response.text[:200]}"
-            return {
-                "address": address,
-                "error": error_detail,
-                "success": False,
-            }
-        response.raise_for_status()
-        data = response.json()
+        data = response["data"].get("data") or {}
+        # GraphQL errors carry the alias of the field they failed in as the first path
+        # element, so one bad address only fails its own lookup
+        errors = response["data"].get("errors", [])
+        alias_errors: Dict[str, List[Any]] = {}
+        for error in errors:
+            path = error.get("path") if isinstance(error, dict) else None
+            alias = path[0] if path else None
+            if not isinstance(alias, str):
+                # Not tied to one address (e.g. a malformed query): fails the whole batch
+                return fail_all(f"GraphQL errors: {orjson.dumps(errors).decode()}")
+            alias_errors.setdefault(alias, []).append(error)
+        for i, address in enumerate(valid_addresses):
+            alias = f"a{i}"
+            if alias in alias_errors:
+                results[address] = {
+                    "address": address,
+                    "error": f"GraphQL errors: {orjson.dumps(alias_errors[alias]).decode()}",
+                    "success": False,
+                }
+                continue
+            ethereum_data = data.get(alias) or {}
+            results[address] = _format_address_balances(address, ethereum_data.get("address", []))
+        return results
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        error_msg = f"Request error: {str(e)}"
+        logger.warning("Batch balance fetch request error for %s: %s", valid_addresses, error_msg)
+        return fail_all(error_msg)
+    except Exception as e:
+        error_msg = f"Unexpected error: {str(e)}"
+        logger.exception("Batch balance fetch unexpected error for %s", valid_addresses)
+        return fail_all(error_msg)
+
+
+@lru_cache(maxsize=BITQUERY_BATCH_MAX_SIZE)
+def build_batch_balances_query(count: int) -> str:
+    """Build a GraphQL query fetching balances for several addresses at once.
+    
+    Args:
+        count: Number of addresses; they are bound to variables $a0..$a{count-1}
         
-        if "errors" in data:
-            return {
-                "address": address,
-                "error": f"GraphQL errors: {json.dumps(data['errors'])}",
-                "success": False,
-            }
+    Returns:
+        Query string with one aliased ``ethereum`` root field per address
+    """
+    params = ", ".join(f"$a{i}: String!" for i in range(count))
+    roots = "".join(
+        f"  a{i}: ethereum(network: cronos) {{\n"
+        f"    address(address: {{is: $a{i}}}) {{{BALANCE_FIELDS}\n    }}\n"
+        f"  }}\n"
+        for i in range(count)
+    )
+    return f"query GetCronosBalancesBatch({params}) {{\n{roots}}}\n"
+
+
+class BalanceBatcher:
+    """Coalesce balance lookups arriving within a short window into one request.
+    
+    Callers enqueue an address and await a future. A background worker waits
+    ``window`` seconds after the first queued address, drains the queue and
+    resolves every pending future from a single batched Bitquery call.
+    """
+
+    def __init__(
+        self,
+        window: float = BITQUERY_BATCH_WINDOW,
+        max_size: int = BITQUERY_BATCH_MAX_SIZE,
+    ):
+        self._window = window
+        self._max_size = max_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._dispatches: set = set()
+
+    async def fetch(self, address: str) -> Dict[str, Any]:
+        """Queue an address for the next batch and wait for its balances."""
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run(self._queue))
+        future = loop.create_future()
+        self._queue.put_nowait((address, future))
+        return await future
+
+    async def close(self) -> None:
+        """Stop the background worker. Called on application shutdown.
         
-        # Parse Bitquery API v2 response structure
-        ethereum_data = data.get("data", {}).get("ethereum", {})
-        address_data = ethereum_data.get("address", [])
+        Batches already sent are allowed to finish; lookups still waiting for the
+        batch window are cancelled.
+        """
+        worker, queue = self._worker, self._queue
+        self._worker = self._queue = None
+        # A worker left over from another (already closed) event loop cannot be awaited
+        if worker is None or worker.get_loop() is not asyncio.get_running_loop():
+            return
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        while not queue.empty():
+            _, future = queue.get_nowait()
+            future.cancel()
+        if self._dispatches:
+            await asyncio.gather(*self._dispatches, return_exceptions=True)
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        """Drain the queue every window and dispatch the collected lookups."""
+        while True:
+            pending = [await queue.get()]
+            try:
+                await asyncio.sleep(self._window)
+            except asyncio.CancelledError:
+                # Shutting down: release callers whose lookups will not be sent
+                for _, future in pending:
+                    future.cancel()
+                raise
+            while not queue.empty():
+                pending.append(queue.get_nowait())
+            for start in range(0, len(pending), self._max_size):
+                task = asyncio.create_task(self._dispatch(pending[start:start + self._max_size]))
+                # Keep a reference so the task is not garbage collected mid-flight
+                self._dispatches.add(task)
+                task.add_done_callback(self._dispatches.discard)
+
+    async def _dispatch(self, pending: List[tuple]) -> None:
+        """Fetch one batch and resolve the futures waiting on it."""
+        addresses = [address for address, _ in pending]
+        try:
+            if len(addresses) == 1:
+                results = {addresses[0]: await _fetch_cronos_balances_uncached(addresses[0])}
+            else:
+                results = await batch_fetch_cronos_balances(addresses)
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for address, future in pending:
+            if not future.done():
+                future.set_result(results[address])
+
+
+_balance_batcher = BalanceBatcher()
+
+
+async def close_balance_batcher() -> None:
+    """Stop the shared balance batcher. Called on application shutdown."""
+    await _balance_batcher.close()
+
+
+def _invalid_address_result(address: str) -> Dict[str, Any]:
+    """Build the error result returned for a malformed address."""
+    return {
+        "success": False,
+        "error": f"Invalid address format: {address}. Address must start with 0x and contain valid hexadecimal characters.",
+    }
+
+
+async def _query_bitquery(payload: bytes, allow_partial: bool = False) -> Dict[str, Any]:
+    """Send a GraphQL query to Bitquery.
+    
+    Network errors are raised to the caller; API-level failures are returned.
+    
+    Args:
+        payload: JSON-encoded GraphQL request body ({"query": ..., "variables": ...})
+        allow_partial: Treat a response carrying both ``data`` and ``errors`` as a
+            success, leaving the caller to match each error to the field it failed in
         
-        if not address_data:
-            # Address not found or has never had any activity - return zero balance
-            return {
-                "address": address,
-                "balances": [{
-                    "currency": {"name": "Cronos", "symbol": "CRO"},
-                    "value": "0",
-                    "symbol": "CRO",
-                    "name": "Cronos",
-                    "decimals": 18,
-                    "contract": "",
-                    "is_native": True,
-                }],
-                "success": True,
-                "total_fetched": 1,
-                "filtered_out": 0,
-            }
+    Returns:
+        {"success": True, "data": <response JSON>} or {"success": False, "error": <message>}
+    """
+    # Get API endpoint - catch ValueError if the API key is missing
+    try:
+        api_url, headers = get_bitquery_endpoint()
+    except ValueError as e:
+        return {
+            "success": False,
+            "error": str(e),
+        }
+    
+    # Fail fast instead of waiting on timeouts while Bitquery is down
+    if not _bitquery_breaker.allow_request():
+        return {
+            "success": False,
+            "error": BITQUERY_UNAVAILABLE_MESSAGE,
+        }
+    
+    try:
+        status, content_type, body = await _post_bitquery(api_url, payload, headers)
+    except aiohttp.ClientResponseError as e:
+        # Bitquery answered; only overload and server errors count as outages
+        if e.status == 429 or e.status >= 500:
+            _bitquery_breaker.record_failure()
+        else:
+            _bitquery_breaker.record_success()
+        raise
+    except (aiohttp.ClientError, asyncio.TimeoutError):
+        _bitquery_breaker.record_failure()
+        raise
+    _bitquery_breaker.record_success()
+    if status == 401:
+        error_detail = "Unauthorized - Invalid API key. Please check your BITQUERY_API_KEY."
+        return {
+            "error": error_detail + _describe_error_body(body, content_type),
+            "success": False,
+        }
+    if status == 403:
+        error_detail = "Forbidden - The API endpoint may require authentication or have access restrictions."
+        return {
+            "error": error_detail + _describe_error_body(body, content_type),
+            "success": False,
+        }
+    if not body:
+        return {
+            "error": "Empty response from Bitquery",
+            "success": False,
+        }
+    data = orjson.loads(body)
+    
+    if "errors" in data and not (allow_partial and data.get("data")):
+        return {
+            "error": f"GraphQL errors: {orjson.dumps(data['errors']).decode()}",
+            "success": False,
+        }
+    
+    return {"success": True, "data": data}
+
+
+class CircuitBreaker:
+    """Stop calling an upstream service after repeated failures.
+    
+    After ``fail_max`` consecutive failures the circuit opens and requests are
+    refused for ``reset_timeout`` seconds. Then a single trial request is let
+    through: success closes the circuit, failure opens it again.
+    """
+
+    def __init__(
+        self,
+        fail_max: int = BITQUERY_BREAKER_FAIL_MAX,
+        reset_timeout: float = BITQUERY_BREAKER_RESET_TIMEOUT,
+    ):
+        self._fail_max = fail_max
+        self._reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+
+    def allow_request(self) -> bool:
+        """Check whether a request may be sent to the upstream service."""
+        if self._opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self._opened_at < self._reset_timeout:
+            return False
+        # Half-open: let this request through and hold others until it reports back
+        self._opened_at = now
+        return True
+
+    def record_success(self) -> None:
+        """Record a successful request and close the circuit."""
+        self._failures = 0
+        self._opened_at = None
+
+    def record_failure(self) -> None:
+        """Record a failed request, opening the circuit at the threshold."""
+        self._failures += 1
+        if self._failures >= self._fail_max:
+            self._opened_at = time.monotonic()
+
+
+_bitquery_breaker = CircuitBreaker()
+
+
+def _describe_error_body(body: bytes, content_type: str) -> str:
+    """Summarize an error response body for inclusion in an error message.
+    
+    Only bodies declared as JSON are parsed; anything else (e.g. an HTML error
+    page from a proxy) is included as a short text snippet.
+    
+    Args:
+        body: Raw response body
+        content_type: Response content type
         
-        address_info = address_data[0]
-        # Handle case where balance might be None, missing, or empty string
-        native_balance = address_info.get("balance")
-        if native_balance is None or native_balance == "":
-            native_balance = "0"
-        balances_list = address_info.get("balances", []) or []
+    Returns:
+        Detail suffix for the error message (empty if there is nothing useful)
+    """
+    if not body:
+        return ""
+    if content_type == "application/json" or content_type.endswith("+json"):
+        try:
+            error_data = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            pass
+        else:
+            if isinstance(error_data, dict):
+                if "errors" in error_data:
+                    return f" Details: {orjson.dumps(error_data['errors']).decode()}"
+                if "message" in error_data:
+                    return f" Details: {error_data['message']}"
+                return ""
+    return f" Response: {body[:200].decode(errors='replace')}"
+
+
+async def _post_bitquery(
+    api_url: str, payload: bytes, headers: Dict[str, str]
+) -> Tuple[int, str, bytes]:
+    """POST to Bitquery over the pooled session, retrying transient failures.
+    
+    Rate limiting / gateway errors and dropped connections are retried up to
+    BITQUERY_MAX_RETRIES times with exponential backoff. Timeouts are not retried:
+    a hung Bitquery would otherwise cost every attempt's full read timeout.
+    
+    Args:
+        api_url: Bitquery endpoint
+        payload: JSON-encoded GraphQL request body
+        headers: Request headers
         
-        # Transform Bitquery format to our standard format
-        formatted_balances = []
+    Returns:
+        Tuple of HTTP status, content type and raw response body
         
-        # Always add native CRO balance (even if 0) so users can see their balance status
+    Raises:
+        aiohttp.ClientResponseError: For HTTP errors other than 401/403
+    """
+    session = get_http_session()
+    for attempt in range(BITQUERY_MAX_RETRIES + 1):
+        if attempt:
+            await asyncio.sleep(BITQUERY_RETRY_BACKOFF * 2 ** (attempt - 1))
         try:
-            # Bitquery returns native balance in different formats:
-            # - As decimal string (e.g., "24827.849010682339425216") - already in CRO units
-            # - As integer string in wei (e.g., "24827849010682339425216") - in smallest units
-            # - May be "0", "0.0", or None if balance is zero
-            # We need to detect the format and convert to wei (smallest units) for storage
-            native_balance_str = str(native_balance).strip() if native_balance else "0"
-            
-            if '.' in native_balance_str:
-                # Already in decimal format (CRO units), convert to wei
-                # Use Decimal for precision with large numbers
-                native_balance_decimal = Decimal(native_balance_str)
-                # Convert from CRO to wei (multiply by 10^18), even if 0
-                wei_multiplier = Decimal(10) ** 18
-                native_balance_wei = int(native_balance_decimal * wei_multiplier)
-                formatted_balances.append({
-                    "currency": {"name": "Cronos", "symbol": "CRO"},
-                    "value": str(native_balance_wei),
-                    "symbol": "CRO",
-                    "name": "Cronos",
-                    "decimals": 18,
-                    "contract": "",
-                    "is_native": True,
-                })
-            else:
-                # Already in wei (smallest units), use as-is (even if 0)
-                native_balance_int = int(native_balance_str) if native_balance_str else 0
-                formatted_balances.append({
-                    "currency": {"name": "Cronos", "symbol": "CRO"},
-                    "value": str(native_balance_int),
-                    "symbol": "CRO",
-                    "name": "Cronos",
-                    "decimals": 18,
-                    "contract": "",
-                    "is_native": True,
-                })
-        except (ValueError, TypeError) as e:
-            # If parsing fails, default to 0 balance
-            print(f"Error parsing native balance '{native_balance}': {e}, defaulting to 0")
-            formatted_balances.append({
-                "currency": {"name": "Cronos", "symbol": "CRO"},
-                "value": "0",
-                "symbol": "CRO",
-                "name": "Cronos",
-                "decimals": 18,
-                "contract": "",
-                "is_native": True,
-            })
+            async with session.post(api_url, data=payload, headers=headers) as response:
+                if response.status in BITQUERY_RETRY_STATUSES and attempt < BITQUERY_MAX_RETRIES:
+                    continue
+                # 401/403 are reported with details by the caller
+                if response.status not in (401, 403):
+                    response.raise_for_status()
+                return response.status, response.content_type, await response.read()
+        except asyncio.TimeoutError:
+            # aiohttp's connect/read timeouts also subclass ClientConnectionError
+            raise
+        except aiohttp.ClientConnectionError:
+            if attempt == BITQUERY_MAX_RETRIES:
+                raise
+    raise AssertionError("unreachable")
+
+
+def _format_address_balances(address: str, address_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Transform the Bitquery ``address`` field for one wallet into our balance format.
+    
+    Args:
+        address: Wallet address the data belongs to
+        address_data: List returned under ``ethereum.address`` (empty if never active)
         
-        # Add token balances
-        for balance in balances_list:
-            currency = balance.get("currency", {})
-            value = balance.get("value", "0")
-            
-            # Skip zero balances
+    Returns:
+        Dictionary with balance information
+    """
+    if not address_data:
+        # Address not found or has never had any activity - return zero balance
+        zero_balances = [{
+            "currency": {"name": "Cronos", "symbol": "CRO"},
+            "value": "0",
+            "_value_wei": 0,
+            "symbol": "CRO",
+            "name": "Cronos",
+            "decimals": 18,
+            "contract": "",
+            "is_native": True,
+        }]
+        return {
+            "address": address,
+            "balances": zero_balances,
+            "by_symbol": index_balances_by_symbol(zero_balances),
+            "success": True,
+            "total_fetched": 1,
+            "filtered_out": 0,
+        }
+    
+    address_info = address_data[0]
+    # Handle case where balance might be None, missing, or empty string
+    native_balance = address_info.get("balance")
+    if native_balance is None or native_balance == "":
+        native_balance = "0"
+    balances_list = address_info.get("balances", []) or []
+    
+    # Transform Bitquery format to our standard format
+    formatted_balances = []
+    
+    # Always add native CRO balance (even if 0) so users can see their balance status
+    try:
+        # Bitquery returns native balance in different formats:
+        # - As decimal string (e.g., "24827.849010682339425216") - already in CRO units
+        # - As integer string in wei (e.g., "24827849010682339425216") - in smallest units
+        # - May be "0", "0.0", or None if balance is zero
+        # We need to detect the format and convert to wei (smallest units) for storage
+        native_balance_str = str(native_balance).strip() if native_balance else "0"
+    
+        if '.' in native_balance_str:
+            # Already in decimal format (CRO units), convert to wei, even if 0
+            native_balance_wei = cro_to_wei(native_balance_str)
+        else:
+            # Already in wei (smallest units), use as-is (even if 0)
+            native_balance_wei = int(native_balance_str) if native_balance_str else 0
+    except (ValueError, TypeError, ArithmeticError) as e:
+        # If parsing fails, default to 0 balance
+        logger.warning("Error parsing native balance %r: %s, defaulting to 0", native_balance, e)
+        native_balance_wei = 0
+    formatted_balances.append({
+        "currency": {"name": "Cronos", "symbol": "CRO"},
+        "value": str(native_balance_wei),
+        "_value_wei": native_balance_wei,
+        "symbol": "CRO",
+        "name": "Cronos",
+        "decimals": 18,
+        "contract": "",
+        "is_native": True,
+    })
+    
+    # Add token balances in a single pass: zero balances and test tokens are
+    # skipped before any dict is built, and the sort key is computed once here
+    token_balances = []
+    filtered_out = 0
+    for balance in balances_list:
+        currency = balance.get("currency") or {}
+        value = balance.get("value", "0")
+    
+        # Skip zero balances
+        try:
+            value_float = float(value)
+            if value_float == 0:
+                continue
+        except (ValueError, TypeError):
+            continue
+    
+        symbol = currency.get("symbol", "Unknown")
+        name = currency.get("name")
+        if is_test_token(name):
+            filtered_out += 1
+            continue
+    
+        # Get decimals - handle None or missing values
+        decimals_raw = currency.get("decimals")
+        if decimals_raw is None:
+            decimals = 18  # Default for most tokens
+        else:
             try:
-                value_float = float(value)
-                if value_float == 0:
-                    continue
+                decimals = int(decimals_raw)
             except (ValueError, TypeError):
-                continue
-            
-            # Get decimals - handle None or missing values
-            decimals_raw = currency.get("decimals")
-            if decimals_raw is None:
-                decimals = 18  # Default for most tokens
-            else:
-                try:
-                    decimals = int(decimals_raw)
-                except (ValueError, TypeError):
-                    decimals = 18
-            
-            # Bitquery v2 might return value in different formats
-            # If value contains a decimal point, it's already formatted
-            # Otherwise, it's in smallest units and needs conversion
-            if isinstance(value, str) and '.' in value:
-                # Already in decimal format, store as-is but convert to smallest unit for storage
-                value_in_smallest = str(int(float(value) * (10 ** decimals)))
-            else:
-                # In smallest units (wei/satoshi), keep as-is
-                value_in_smallest = str(int(value_float))
-            
-            formatted_balance = {
-                "currency": currency,
-                "value": value_in_smallest,  # Always store in smallest units for consistency
-                "symbol": currency.get("symbol", "Unknown"),
-                "name": currency.get("name", "Unknown"),
-                "decimals": decimals,
-                "contract": currency.get("address", ""),
-                "is_native": False,
-            }
-            formatted_balances.append(formatted_balance)
-        
-        # Filter out test tokens
-        def is_test_token(balance: Dict) -> bool:
-            """Check if a token is a test token."""
-            name = balance.get("name", "").lower()
-            symbol = balance.get("symbol", "").lower()
-            return "test" in name or (symbol.startswith("t") and len(symbol) > 1 and symbol[1:].isupper())
+                decimals = 18
+    
+        # Bitquery v2 might return value in different formats
+        # If value contains a decimal point, it's already formatted
+        # Otherwise, it's in smallest units and needs conversion
+        if isinstance(value, str) and '.' in value:
+            # Already in decimal format, convert to smallest unit for storage
+            value_in_smallest = int(float(value) * pow10(decimals))
+        else:
+            # In smallest units (wei/satoshi), keep as-is
+            value_in_smallest = int(value_float)
+    
+        token_balances.append((value_in_smallest, {
+            "currency": currency,
+            "value": str(value_in_smallest),  # Always store in smallest units for consistency
+            "_value_wei": value_in_smallest,
+            "symbol": symbol,
+            "name": name,
+            "decimals": decimals,
+            "contract": currency.get("address", ""),
+            "is_native": False,
+        }))
+    
+    # Native CRO first, then tokens by value descending
+    token_balances.sort(key=lambda item: item[0], reverse=True)
+    formatted_balances.extend(balance for _, balance in token_balances)
+    
+    return {
+        "address": address,
+        "balances": formatted_balances,
+        "by_symbol": index_balances_by_symbol(formatted_balances),
+        "success": True,
+        "total_fetched": len(formatted_balances),
+        "filtered_out": filtered_out,
+    }
+
+
+# "test" at the start of the name or after a non-letter ("Test USD", "USDC-test"),
+# but not inside words such as "Greatest" or "Contest"
+TEST_TOKEN_NAME_PATTERN = re.compile(r"(?:^|[^a-z])test", re.IGNORECASE)
+
+
+def is_test_token(name: Optional[str]) -> bool:
+    """Check if a token is a test token.
+    
+    Only the name is checked: real tokens such as tBTC use a lowercase "t"
+    prefix, so the symbol says nothing about whether a token is a test token.
+    
+    Args:
+        name: Token name
         
-        filtered_balances = [b for b in formatted_balances if not is_test_token(b)]
+    Returns:
+        True if the token looks like a test token
+    """
+    return bool(name) and TEST_TOKEN_NAME_PATTERN.search(name) is not None
+
+
+def balance_value_wei(balance: Dict[str, Any]) -> int:
+    """Get a balance amount in smallest units.
+    
+    Reads the integer parsed once at fetch time, falling back to the string
+    ``value`` field for balance dicts built elsewhere.
+    
+    Args:
+        balance: Formatted balance dictionary
         
-        # Sort balances: native CRO first, then by value descending
-        def sort_key(balance: Dict) -> tuple:
-            """Sort key: native token first, then by value descending."""
-            is_native = balance.get("is_native", False)
-            try:
-                value = float(balance.get("value", "0"))
-            except (ValueError, TypeError):
-                value = 0
-            return (not is_native, -value)
+    Returns:
+        Amount in smallest units (wei)
         
-        filtered_balances.sort(key=sort_key)
+    Raises:
+        ValueError: If the value cannot be parsed
+    """
+    value_wei = balance.get("_value_wei")
+    if value_wei is None:
+        value_wei = int(balance.get("value", "0"))
+    return value_wei
+
+
+def index_balances_by_symbol(balances: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Index balances by uppercased symbol for O(1) token lookups.
+    
+    Balances are expected in display order (largest first), so when several
+    tokens share a symbol the first one wins.
+    
+    Args:
+        balances: List of formatted balance dictionaries
         
-        return {
-            "address": address,
-            "balances": filtered_balances,
-            "success": True,
-            "total_fetched": len(filtered_balances),
-            "filtered_out": len(formatted_balances) - len(filtered_balances),
-        }
-    except requests.exceptions.RequestException as e:
-        error_msg = f"Request error: {str(e)}"
-        print(f"Balance fetch request error for {address}: {error_msg}")
-        return {
-            "address": address,
-            "error": error_msg,
-            "success": False,
-        }
-    except Exception as e:
-        error_msg = f"Unexpected error: {str(e)}"
-        print(f"Balance fetch unexpected error for {address}: {error_msg}")
-        import traceback
-        traceback.print_exc()
-        return {
-            "address": address,
-            "error": error_msg,
-            "success": False,
-        }
+    Returns:
+        Dictionary mapping uppercased symbol to its balance dictionary
+    """
+    by_symbol: Dict[str, Dict[str, Any]] = {}
+    for balance in balances:
+        by_symbol.setdefault((balance.get("symbol") or "").upper(), balance)
+    return by_symbol
 
 
 def format_cronos_balance_response(balances_data: Dict[str, Any], address: str) -> str:
@@ -659,7 +1277,7 @@ def format_cronos_balance_response(balances_data: Dict[str, Any], address: str)
         Formatted balance string
     """
     if not balances_data.get("success", False):
-        return f"Error fetching Cronos balance: {balances_data.get('error', 'Unknown error')}"
+        return f"{TOOL_ERROR_PREFIX}{balances_data.get('error', 'Unknown error')}"
     balances = balances_data.get("balances", [])
     
     # Always show at least native CRO balance (even if 0)
@@ -670,9 +1288,8 @@ def format_cronos_balance_response(balances_data: Dict[str, Any], address: str)
     for balance in balances:
         if balance.get("is_native", False):
             native_balance_shown = True
-        value = balance.get("value", "0")
         try:
-            if int(value) > 0:
+            if balance_value_wei(balance) > 0:
                 has_non_zero_balance = True
                 break
         except (ValueError, TypeError):
@@ -697,21 +1314,21 @@ def format_cronos_balance_response(balances_data: Dict[str, Any], address: str)
     for idx, balance in enumerate(balances, 1):
         value = balance.get("value", "0")
         symbol = balance.get("symbol", "Unknown")
-        name = balance.get("name", "Unknown")
+        name = balance.get("name") or "Unknown"
         decimals = int(balance.get("decimals", 18))
         contract = balance.get("contract", "")
         is_native = balance.get("is_native", False)
         
         # Format balance with proper precision
         try:
-            value_int = int(value)
+            value_int = balance_value_wei(balance)
             if decimals > 0:
-                balance_decimal = value_int / (10 ** decimals)
+                balance_decimal = value_int / pow10(decimals)
                 # Use more precision for very small values
                 if balance_decimal < 0.000001:
-                    formatted_balance = f"{balance_decimal:.18f}".rstrip('0').rstrip('.')
+                    formatted_balance = _format_trimmed(balance_decimal, 18)
                 else:
-                    formatted_balance = f"{balance_decimal:.6f}".rstrip('0').rstrip('.')
+                    formatted_balance = _format_trimmed(balance_decimal, 6)
             else:
                 formatted_balance = str(value_int)
         except (ValueError, TypeError):
@@ -727,12 +1344,14 @@ def format_cronos_balance_response(balances_data: Dict[str, Any], address: str)
     filtered_out = balances_data.get("filtered_out", 0)
     if filtered_out > 0:
         result_lines.append(f"\nNote: {filtered_out} test token(s) filtered out")
+    if balances_data.get("stale", False):
+        result_lines.append(f"\nNote: {STALE_BALANCE_NOTE}")
     
     return "\n".join(result_lines)
 
 
 @tool
-def get_balance(address: str, network: str = DEFAULT_NETWORK) -> str:
+async def get_balance(address: str, network: str = DEFAULT_NETWORK) -> str:
     """Get the balance of a cryptocurrency address on Cronos.
 
     Args:
@@ -744,13 +1363,16 @@ def get_balance(address: str, network: str = DEFAULT_NETWORK) -> str:
     """
     network_lower = network.lower()
     if network_lower in ["cronos"]:
-        balances_data = fetch_cronos_balances(address)
+        balances_data = await fetch_cronos_balances(address)
+        if len(balances_data.get("balances", [])) > FORMAT_OFFLOAD_THRESHOLD:
+            # Formatting hundreds of lines would stall other sessions on the loop
+            return await asyncio.to_thread(format_cronos_balance_response, balances_data, address)
         return format_cronos_balance_response(balances_data, address)
     return f"Balance for {address} on {network}: Not implemented yet (only Cronos is currently supported)"
 
 
 @tool
-def get_token_balance(address: str, token: str, network: str = DEFAULT_NETWORK) -> str:
+async def get_token_balance(address: str, token: str, network: str = DEFAULT_NETWORK) -> str:
     """Get the balance of a specific token for an address on Cronos.
 
     Args:
@@ -763,34 +1385,48 @@ def get_token_balance(address: str, token: str, network: str = DEFAULT_NETWORK)
     """
     network_lower = network.lower()
     if network_lower in ["cronos"]:
-        balances_data = fetch_cronos_balances(address)
+        balances_data = await fetch_cronos_balances(address)
         if not balances_data.get("success", False):
-            return f"Error fetching Cronos balance: {balances_data.get('error', 'Unknown error')}"
-        balances = balances_data.get("balances", [])
+            return f"{TOOL_ERROR_PREFIX}{balances_data.get('error', 'Unknown error')}"
         token_upper = token.upper()
-        for balance in balances:
-            symbol = balance.get("symbol", "").upper()
-            if symbol == token_upper or token_upper in symbol:
-                value = balance.get("value", "0")
-                decimals = int(balance.get("decimals", 18))
-                name = balance.get("name", "Unknown Token")
-                try:
-                    value_int = int(value)
-                    formatted_balance = value_int / (10 ** decimals)
-                    return f"{address} has {formatted_balance:.6f} {symbol} ({name}) on Cronos"
-                except (ValueError, TypeError):
-                    return f"{address} has {value} {symbol} (raw) on Cronos"
-        return f"No {token_upper} balance found for {address} on Cronos"
+        balance = balances_data.get("by_symbol", {}).get(token_upper)
+        if balance is None:
+            # Fall back to a partial symbol match (e.g. "USDC" -> "USDC.E")
+            balance = next(
+                (
+                    b for b in balances_data.get("balances", [])
+                    if token_upper in (b.get("symbol") or "").upper()
+                ),
+                None,
+            )
+        if balance is None:
+            return f"No {token_upper} balance found for {address} on Cronos"
+        symbol = (balance.get("symbol") or "").upper()
+        value = balance.get("value", "0")
+        decimals = int(balance.get("decimals", 18))
+        name = balance.get("name")
+        label = f"{symbol} ({name})" if name else symbol
+        note = f" ({STALE_BALANCE_NOTE})" if balances_data.get("stale", False) else ""
+        try:
+            value_int = balance_value_wei(balance)
+            formatted_balance = value_int / pow10(decimals)
+            return f"{address} has {formatted_balance:.6f} {label} on Cronos{note}"
+        except (ValueError, TypeError):
+            return f"{address} has {value} {symbol} (raw) on Cronos{note}"
     return f"Token balance for {address}: {token.upper()} on {network} - Not implemented yet (only Cronos is currently supported)"
 
 
-def get_tools() -> List[Any]:
-    """Get the list of tools available to the agent."""
-    return [get_balance, get_token_balance]
+# Frozen so consumers cannot mutate the tool set shared by every agent build
+TOOLS: Tuple[Any, ...] = (get_balance, get_token_balance)
+
+
+def get_tools() -> Tuple[Any, ...]:
+    """Get the tools available to the agent."""
+    return TOOLS
 
 
-def validate_openai_api_key() -> None:
-    """Validate that OpenAI API key is set."""
+def validate_openai_api_key() -> str:
+    """Validate that OpenAI API key is set and return it."""
     openai_api_key = os.getenv(ENV_OPENAI_API_KEY)
     if not openai_api_key:
         raise ValueError(
@@ -799,26 +1435,60 @@ def validate_openai_api_key() -> None:
             "  export OPENAI_API_KEY=your-api-key-here\n"
             "Or add it to your environment configuration."
         )
+    return openai_api_key
 
 
-def create_chat_model() -> ChatOpenAI:
-    """Create and configure the ChatOpenAI model."""
+def create_openai_http_client() -> httpx.AsyncClient:
+    """Create the pooled httpx client a chat model sends its OpenAI requests over.
+
+    HTTP/2 multiplexes concurrent completions over keep-alive connections, so agent
+    runs reuse established TLS sessions instead of opening new ones. The client is
+    owned by the BalanceAgent that uses it and closed together with that agent.
+
+    Returns:
+        New httpx AsyncClient
+    """
+    return httpx.AsyncClient(
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        ),
+    )
+
+
+def create_chat_model(api_key: str, http_async_client: httpx.AsyncClient) -> ChatOpenAI:
+    """Create and configure the ChatOpenAI model.
+    
+    Args:
+        api_key: OpenAI API key, as returned by validate_openai_api_key()
+        http_async_client: Client for OpenAI requests; ChatOpenAI keeps it for its lifetime
+    """
     model_name = os.getenv(ENV_OPENAI_MODEL, DEFAULT_MODEL)
-    return ChatOpenAI(model=model_name, temperature=DEFAULT_TEMPERATURE)
+    return ChatOpenAI(
+        model=model_name,
+        temperature=DEFAULT_TEMPERATURE,
+        api_key=api_key,
+        http_async_client=http_async_client,
+    )
 
 
 def is_assistant_message(message: Any) -> bool:
     """Check if a message is from the assistant."""
-    if hasattr(message, MESSAGE_KEY_TYPE) and hasattr(message, MESSAGE_KEY_CONTENT):
-        return (
-            message.type == MESSAGE_TYPE_AI
-            or getattr(message, MESSAGE_KEY_ROLE, None) == MESSAGE_ROLE_ASSISTANT
-        )
+    # Agent results hold LangChain message objects; one isinstance check covers the common case
+    if isinstance(message, AIMessage):
+        return True
     if isinstance(message, dict):
         return (
             message.get(MESSAGE_KEY_ROLE) == MESSAGE_ROLE_ASSISTANT
             or message.get(MESSAGE_KEY_TYPE) == MESSAGE_TYPE_AI
         )
+    message_type = getattr(message, MESSAGE_KEY_TYPE, None)
+    if message_type is not None and hasattr(message, MESSAGE_KEY_CONTENT):
+        return (
+            message_type == MESSAGE_TYPE_AI
+            or getattr(message, MESSAGE_KEY_ROLE, None) == MESSAGE_ROLE_ASSISTANT
+        )
     return False
 
 
@@ -833,24 +1503,29 @@ def extract_message_content(message: Any) -> str:
 
 def extract_assistant_response(result: Any) -> str:
     """Extract the assistant's response from the agent result."""
-    if not isinstance(result, dict) or MESSAGE_KEY_MESSAGES not in result:
-        return _extract_fallback_output(result)
-    messages = result[MESSAGE_KEY_MESSAGES]
+    messages = result.get(MESSAGE_KEY_MESSAGES) if isinstance(result, dict) else None
     if not messages:
         return _extract_fallback_output(result)
-    assistant_content = _find_assistant_message(messages)
-    if assistant_content:
-        return assistant_content
-    return _extract_last_message_content(messages)
+    # A LangGraph run normally ends with the final AIMessage
+    last_message = messages[-1]
+    if isinstance(last_message, AIMessage) and last_message.content:
+        return last_message.content
+    return _find_assistant_message(messages) or _extract_last_message_content(messages)
 
 
 def _find_assistant_message(messages: List[Any]) -> str:
     """Find the last assistant message in the messages list."""
+    # The final reply is almost always the last message, which is checked first;
+    # content is read inline to skip a helper call per message
     for message in reversed(messages):
-        if is_assistant_message(message):
-            content = extract_message_content(message)
-            if content:
-                return content
+        if not is_assistant_message(message):
+            continue
+        if isinstance(message, dict):
+            content = message.get(MESSAGE_KEY_CONTENT, "")
+        else:
+            content = getattr(message, MESSAGE_KEY_CONTENT, "")
+        if content:
+            return content
     return ""
 
 
@@ -871,57 +1546,147 @@ def _extract_fallback_output(result: Any) -> str:
 
 def format_error_message(error: Exception) -> str:
     """Format error message for user-friendly display."""
-    error_msg = str(error).lower()
-    if ERROR_API_KEY in error_msg:
-        return ERROR_AUTH_MESSAGE
-    if ERROR_TIMEOUT in error_msg:
+    # One case-insensitive pass over the text; an API key mention wins over a timeout
+    timed_out = False
+    for match in ERROR_PATTERN.finditer(str(error)):
+        if match.lastindex == 1:
+            return ERROR_AUTH_MESSAGE
+        timed_out = True
+    if timed_out:
         return ERROR_TIMEOUT_MESSAGE
     return f"{ERROR_GENERIC_PREFIX}{error}. Please try again."
 
 
+def get_agent_concurrency() -> int:
+    """Get the maximum number of concurrent agent runs from environment or default."""
+    return int(os.getenv(ENV_BALANCE_AGENT_CONCURRENCY, str(DEFAULT_AGENT_CONCURRENCY)))
+
+
+def get_response_cache_ttl() -> float:
+    """Get the agent response cache TTL in seconds from environment or default."""
+    return float(os.getenv(ENV_BALANCE_RESPONSE_CACHE_TTL, str(DEFAULT_RESPONSE_CACHE_TTL)))
+
+
+# Queries asking for explicitly fresh data always go to the agent
+TIME_SENSITIVE_QUERY_PATTERN = re.compile(r"\b(?:now|latest)\b", re.IGNORECASE)
+
+
+def is_cacheable_result(result: Any) -> bool:
+    """Check whether an agent run may be cached.
+    
+    A run whose tools failed or served stale balances still ends in a normal
+    assistant reply (the LLM explains the failure), so the tool results are
+    inspected rather than the envelope's success flag.
+    """
+    messages = result.get(MESSAGE_KEY_MESSAGES) if isinstance(result, dict) else None
+    for message in messages or ():
+        if not isinstance(message, ToolMessage):
+            continue
+        if message.status == "error":
+            return False
+        content = message.content
+        if isinstance(content, str) and (
+            content.startswith(TOOL_ERROR_PREFIX) or STALE_BALANCE_NOTE in content
+        ):
+            return False
+    return True
+
+
+def response_cache_key(query: str, session_id: str) -> Optional[Tuple[str, bytes]]:
+    """Get the response cache key for a query, or None if it must not be cached."""
+    if TIME_SENSITIVE_QUERY_PATTERN.search(query):
+        return None
+    return session_id, hashlib.blake2b(query.encode(), digest_size=16).digest()
+
+
+@lru_cache(maxsize=1)
+def get_artifact_service() -> InMemoryArtifactService:
+    """Get the process-wide in-memory artifact service."""
+    return InMemoryArtifactService()
+
+
+@lru_cache(maxsize=1)
+def get_session_service() -> InMemorySessionService:
+    """Get the process-wide in-memory session service."""
+    return InMemorySessionService()
+
+
+@lru_cache(maxsize=1)
+def get_memory_service() -> InMemoryMemoryService:
+    """Get the process-wide in-memory memory service."""
+    return InMemoryMemoryService()
+
+
 class BalanceAgent:
     def __init__(self):
+        # Bounds concurrent LLM round trips; independent sessions run in parallel up to
+        # the limit and further requests wait instead of piling onto the OpenAI client
+        self._semaphore = asyncio.Semaphore(get_agent_concurrency())
+        # Successful answers per (session, query digest); a repeated question within
+        # the TTL skips the LLM and tool round trips entirely
+        response_ttl = get_response_cache_ttl()
+        self._response_cache: Optional[TTLCache] = (
+            TTLCache(maxsize=RESPONSE_CACHE_MAXSIZE, ttl=response_ttl) if response_ttl > 0 else None
+        )
         self._agent = self._build_agent()
         self._runner = Runner(
             app_name="balanceagent",
             agent=self._agent,
-            artifact_service=InMemoryArtifactService(),
-            session_service=InMemorySessionService(),
-            memory_service=InMemoryMemoryService(),
+            # Shared so sessions survive agent rebuilds instead of being orphaned
+            artifact_service=get_artifact_service(),
+            session_service=get_session_service(),
+            memory_service=get_memory_service(),
         )
 
     def _build_agent(self):
         """Build the agent using the new create_agent API."""
-        validate_openai_api_key()
-        model = create_chat_model()
-        tools = get_tools()
-        system_prompt = get_system_prompt()
+        api_key = validate_openai_api_key()
+        # The model holds on to this client, so it is closed only with the agent
+        self._http_client = create_openai_http_client()
+        model = create_chat_model(api_key, self._http_client)
         return create_agent(
             model=model,
-            tools=tools,
-            system_prompt=system_prompt,
+            tools=TOOLS,
+            system_prompt=SYSTEM_PROMPT,
         )
 
+    async def aclose(self) -> None:
+        """Close the OpenAI HTTP client owned by this agent."""
+        await self._http_client.aclose()
+
     async def invoke(self, query: str, session_id: str) -> str:
         """Invoke the agent with a query."""
+        cache_key = None
+        if self._response_cache is not None:
+            cache_key = response_cache_key(query, session_id)
+        if cache_key is not None:
+            cached = self._response_cache.get(cache_key)
+            if cached is not None:
+                return cached
         try:
             result = await self._invoke_agent(query, session_id)
             output = extract_assistant_response(result)
             validated_output = self._validate_output(output)
             # Return as JSON string to ensure compatibility with ADK agent expectations
-            return json.dumps({"response": validated_output, "success": True})
+            response = orjson.dumps({"response": validated_output, "success": True}).decode()
+            if cache_key is not None and is_cacheable_result(result):
+                self._response_cache[cache_key] = response
+            return response
         except Exception as e:
-            print(f"Error in agent invoke: {e}")
+            logger.exception("Error in agent invoke")
             error_message = format_error_message(e)
             # Return error as JSON string
-            return json.dumps({"response": error_message, "success": False, "error": str(e)})
+            return orjson.dumps(
+                {"response": error_message, "success": False, "error": str(e)}
+            ).decode()
 
     async def _invoke_agent(self, query: str, session_id: str) -> Any:
         """Invoke the agent with the given query and session."""
-        return await self._agent.ainvoke(
-            {"messages": [{MESSAGE_KEY_ROLE: MESSAGE_ROLE_USER, MESSAGE_KEY_CONTENT: query}]},
-            config={"configurable": {"thread_id": session_id}},
-        )
+        async with self._semaphore:
+            return await self._agent.ainvoke(
+                {"messages": [{MESSAGE_KEY_ROLE: MESSAGE_ROLE_USER, MESSAGE_KEY_CONTENT: query}]},
+                config={"configurable": {"thread_id": session_id}},
+            )
 
     def _validate_output(self, output: str) -> str:
         """Validate and return output, or return default message if empty."""
@@ -930,23 +1695,64 @@ class BalanceAgent:
         return output
 
 
+@lru_cache(maxsize=1)
+def get_balance_agent() -> BalanceAgent:
+    """Get the process-wide BalanceAgent, building it on first use.
+    
+    Building the agent validates the OpenAI key, creates the chat model client
+    and compiles the LangGraph graph, so it is done once and shared by all
+    executors.
+    """
+    return BalanceAgent()
+
+
+async def reset_balance_agent() -> None:
+    """Drop the shared BalanceAgent and close its OpenAI client.
+    
+    Called on application shutdown (and in tests). Pooled connections belong to the
+    event loop that opened them, so the next call rebuilds the agent and its client
+    on the running loop.
+    """
+    if not get_balance_agent.cache_info().currsize:
+        return
+    agent = get_balance_agent()
+    get_balance_agent.cache_clear()
+    await agent.aclose()
+
+
 def get_session_id(context: RequestContext) -> str:
     """Extract session ID from context or return default."""
     return getattr(context, "context_id", DEFAULT_SESSION_ID)
 
 
+def new_message_id() -> str:
+    """Generate a random version 4 UUID string for a message ID.
+    
+    Formats os.urandom bytes directly instead of going through a uuid.UUID object.
+    """
+    h = os.urandom(16).hex()
+    # Set the version nibble to 4 and the variant bits to 10xx as RFC 4122 requires
+    variant = "89ab"[int(h[16], 16) & 3]
+    return f"{h[:8]}-{h[8:12]}-4{h[13:16]}-{variant}{h[17:20]}-{h[20:32]}"
+
+
 def create_message(content: str) -> Message:
-    """Create a message object with the given content."""
-    return Message(
-        message_id=str(uuid.uuid4()),
+    """Create a message object with the given content.
+    
+    Every field is produced here with the right type, so the models are built with
+    model_construct and skip pydantic validation.
+    """
+    return Message.model_construct(
+        message_id=new_message_id(),
         role=Role.agent,
-        parts=[Part(root=TextPart(kind="text", text=content))],
+        parts=[Part.model_construct(root=TextPart.model_construct(kind="text", text=content))],
     )
 
 
 class BalanceAgentExecutor(AgentExecutor):
     def __init__(self):
-        self.agent = BalanceAgent()
+        # Build the shared agent up front so a missing OpenAI key fails at startup
+        get_balance_agent()
 
     async def execute(
         self,
@@ -956,7 +1762,11 @@ class BalanceAgentExecutor(AgentExecutor):
         """Execute the agent's logic for a given request context."""
         query = context.get_user_input()
         session_id = get_session_id(context)
-        final_content = await self.agent.invoke(query, session_id)
+        # Looked up per request: the shared agent is rebuilt after each app shutdown
+        final_content = await get_balance_agent().invoke(query, session_id)
+        # The reply is sent as one Message: A2A treats a Message event as the end of
+        # the response, and callers parse its text as the complete JSON envelope.
+        # Token streaming would need task status/artifact update events instead.
         message = create_message(final_content)
         await event_queue.enqueue_event(message)
 
@@ -969,32 +1779,56 @@ class BalanceAgentExecutor(AgentExecutor):
         raise NotImplementedError("cancel not supported")
 
 
-def create_balance_agent_app(card_url: str) -> A2AStarletteApplication:
+def get_max_tasks() -> int:
+    """Get the maximum number of in-memory A2A tasks from environment or default."""
+    return int(os.getenv(ENV_BALANCE_MAX_TASKS, str(DEFAULT_MAX_TASKS)))
+
+
+class BoundedInMemoryTaskStore(InMemoryTaskStore):
+    """In-memory task store that evicts the least recently used tasks.
+    
+    The stock store keeps every task for the life of the process; this one holds at
+    most ``maxsize`` tasks, refreshing a task's position whenever it is saved or read.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAX_TASKS):
+        super().__init__()
+        self.maxsize = maxsize
+        self.tasks = OrderedDict(self.tasks)
+
+    async def save(self, task: Task, *args: Any, **kwargs: Any) -> None:
+        """Save or update a task, evicting the oldest tasks beyond maxsize."""
+        async with self.lock:
+            self.tasks[task.id] = task
+            self.tasks.move_to_end(task.id)
+            while len(self.tasks) > self.maxsize:
+                self.tasks.popitem(last=False)
+
+    async def get(self, task_id: str, *args: Any, **kwargs: Any) -> Optional[Task]:
+        """Get a task by ID, marking it as recently used."""
+        async with self.lock:
+            task = self.tasks.get(task_id)
+            if task is not None:
+                self.tasks.move_to_end(task_id)
+            return task
+
+
+def create_balance_agent_app(
+    card_url: str, maxsize: Optional[int] = None
+) -> A2AStarletteApplication:
     """Create and configure the A2A server application for the balance agent.
 
     Args:
         card_url: The base URL where the agent card will be accessible
+        maxsize: Maximum number of tasks kept in memory (default: BALANCE_MAX_TASKS)
 
     Returns:
         A2AStarletteApplication instance configured for the balance agent
     """
-    agent_card = AgentCard(
-        name="Balance Agent",
-        description=(
-            "LangGraph powered agent that helps to get "
-            "cryptocurrency balances across multiple chains"
-        ),
-        url=card_url,
-        version="2.0.0",
-        default_input_modes=["text"],
-        default_output_modes=["text"],
-        capabilities=AgentCapabilities(streaming=True),
-        skills=[create_agent_skill()],
-        supports_authenticated_extended_card=False,
-    )
+    agent_card = get_agent_card(card_url)
     request_handler = DefaultRequestHandler(
         agent_executor=BalanceAgentExecutor(),
-        task_store=InMemoryTaskStore(),
+        task_store=BoundedInMemoryTaskStore(maxsize if maxsize is not None else get_max_tasks()),
     )
     return A2AStarletteApplication(
         agent_card=agent_card,
@@ -0,0 +1,59 @@
+"""
+Application logging setup.
+
+Kept free of application imports so logging can be configured (and tested)
+without building the FastAPI app and its agents.
+"""
+
+import logging
+import logging.handlers
+import os
+import queue
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+# Configuration constants
+DEFAULT_LOG_LEVEL = "INFO"
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+# Environment variable keys
+ENV_LOG_LEVEL = "LOG_LEVEL"
+
+
+@contextmanager
+def queued_logging() -> Iterator[None]:
+    """Run the root logger's handlers on a background thread while active.
+
+    The existing root handlers (or a stderr handler if there are none) are moved
+    behind a QueueHandler and driven by a QueueListener thread, so their stream
+    and file writes no longer happen on the event loop. The QueueHandler still
+    formats each message and traceback on the thread that logs, before enqueueing.
+    On exit queued records are flushed and the previous handlers and level are
+    restored.
+    """
+    root = logging.getLogger()
+    previous_handlers = root.handlers[:]
+    previous_level = root.level
+    handlers = previous_handlers
+    if not handlers:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers = [stream_handler]
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    for handler in previous_handlers:
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(os.getenv(ENV_LOG_LEVEL, DEFAULT_LOG_LEVEL).upper())
+    listener.start()
+    try:
+        yield
+    finally:
+        # Hand logging back to the original handlers, then flush what is still queued
+        root.removeHandler(queue_handler)
+        for handler in previous_handlers:
+            root.addHandler(handler)
+        root.setLevel(previous_level)
+        listener.stop()
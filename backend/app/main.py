@@ -6,6 +6,8 @@ agent applications, and sets up middleware and health check endpoints.
 """
 
 import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
 from dotenv import load_dotenv
 from fastapi import FastAPI
@@ -15,7 +17,10 @@ load_dotenv()
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+from app.agents.balance.agent import close_balance_batcher
+from app.agents.balance.agent import close_http_session as close_balance_http_session
 from app.agents.balance.agent import create_balance_agent_app
+from app.agents.balance.agent import reset_balance_agent
 from app.agents.bridge.agent import create_bridge_agent_app
 from app.agents.orderbook.agent import create_orderbook_agent_app
 from app.agents.prediction.agent import create_prediction_agent_app
@@ -26,6 +31,7 @@ from app.agents.bitcoin_defi.agent import create_bitcoin_defi_agent_app
 from app.agents.stablecoin.agent import create_stablecoin_agent_app
 from app.agents.analytics.agent import create_analytics_agent_app
 from app.agents.orchestrator.agent import create_orchestrator_agent_app
+from app.logging_config import queued_logging
 
 # Configuration constants
 DEFAULT_AGENTS_PORT = 8000
@@ -100,6 +106,21 @@ def register_agents(app: FastAPI) -> None:
     app.mount("/orchestrator", orchestrator_agent_app)
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Manage shared resources for the lifetime of the application.
+    
+    Args:
+        app: The FastAPI application instance
+    """
+    with queued_logging():
+        yield
+        # Stop background workers, then release pooled HTTP connections held by the agents
+        await close_balance_batcher()
+        await close_balance_http_session()
+        await reset_balance_agent()
+
+
 def create_app() -> FastAPI:
     """Create and configure the main FastAPI application.
     
@@ -110,6 +131,7 @@ def create_app() -> FastAPI:
         title="Backend API",
         description="Backend server with FastAPI",
         version=API_VERSION,
+        lifespan=lifespan,
     )
     
     # Add CORS middleware
@@ -0,0 +1,241 @@
+"""Tests for balance agent helpers."""
+
+import threading
+import uuid
+from collections.abc import Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import orjson
+import pytest
+from a2a.types import Task, TaskState, TaskStatus
+from fastapi.testclient import TestClient
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from app.agents.balance.agent import (
+    ENV_RENDER_EXTERNAL_URL,
+    ERROR_AUTH_MESSAGE,
+    ERROR_GENERIC_PREFIX,
+    ERROR_TIMEOUT_MESSAGE,
+    STALE_BALANCE_NOTE,
+    TOOL_ERROR_PREFIX,
+    BalanceAgent,
+    BoundedInMemoryTaskStore,
+    create_agent_card,
+    format_balance,
+    format_error_message,
+    get_balance_agent,
+    is_test_token,
+    new_message_id,
+    validate_address,
+)
+
+
+@pytest.mark.parametrize(
+    "address",
+    [
+        "0x742d35Cc6634C0532925a3b844Bc9e7595f0bEb",
+        "0x0000000000000000000000000000000000000000",
+        "0xABCDEFabcdef0123456789",
+    ],
+)
+def test_validate_address_accepts_valid(address: str) -> None:
+    """Test that 0x-prefixed hexadecimal addresses are accepted."""
+    assert validate_address(address)
+
+
+@pytest.mark.parametrize(
+    "address",
+    [
+        "",
+        "0x",
+        "742d35Cc6634C0532925a3b844Bc9e7595f0bEb",
+        "0X742d35Cc6634C0532925a3b844Bc9e7595f0bEb",
+        "0x742d35Cc6634C0532925a3b844Bc9e7595f0bEg",
+        "0x742d35Cc6634C0532925a3b844Bc9e7595f0bEb\n",
+    ],
+)
+def test_validate_address_rejects_invalid(address: str) -> None:
+    """Test that malformed addresses are rejected."""
+    assert not validate_address(address)
+
+
+@pytest.mark.parametrize(
+    ("name", "expected"),
+    [
+        ("Test Token", True),
+        ("USDC-test", True),
+        ("Testnet Dollar", True),
+        ("Test USDC", True),
+        ("Contest Reward", False),
+        ("Greatest Coin", False),
+        ("USD Coin", False),
+        ("Tether", False),
+        ("tBTC v2", False),
+        ("", False),
+        (None, False),
+    ],
+)
+def test_is_test_token(name: str | None, expected: bool) -> None:
+    """Test test-token detection by name."""
+    assert is_test_token(name) is expected
+
+
+@pytest.mark.parametrize(
+    ("amount", "decimals", "expected"),
+    [
+        ("0", 18, "0"),
+        ("1500000000000000000", 18, "1.5"),
+        ("100000000", 6, "100"),
+        ("1234567", 6, "1.234567"),
+        ("42", 0, "42"),
+    ],
+)
+def test_format_balance(amount: str, decimals: int, expected: str) -> None:
+    """Test conversion from smallest units to trimmed human-readable amounts."""
+    assert format_balance(amount, decimals) == expected
+
+
+@pytest.mark.parametrize(
+    ("error", "expected"),
+    [
+        ("Incorrect API key provided", ERROR_AUTH_MESSAGE),
+        ("Request TIMEOUT after 30s", ERROR_TIMEOUT_MESSAGE),
+        ("timeout while validating api key", ERROR_AUTH_MESSAGE),
+        ("boom", f"{ERROR_GENERIC_PREFIX}boom. Please try again."),
+    ],
+)
+def test_format_error_message(error: str, expected: str) -> None:
+    """Test that errors map to user-facing messages, preferring auth errors."""
+    assert format_error_message(Exception(error)) == expected
+
+
+def test_new_message_id_is_uuid4() -> None:
+    """Test that generated message IDs are canonical version 4 UUID strings."""
+    message_id = new_message_id()
+    parsed = uuid.UUID(message_id)
+    assert parsed.version == 4
+    assert parsed.variant == uuid.RFC_4122
+    assert str(parsed) == message_id
+
+
+async def test_bounded_task_store_evicts_least_recently_used() -> None:
+    """Test that the task store drops the least recently used task beyond maxsize."""
+    store = BoundedInMemoryTaskStore(maxsize=2)
+    for task_id in ("a", "b"):
+        await store.save(
+            Task(id=task_id, context_id="ctx", status=TaskStatus(state=TaskState.completed))
+        )
+    assert await store.get("a") is not None
+    await store.save(Task(id="c", context_id="ctx", status=TaskStatus(state=TaskState.completed)))
+    assert await store.get("b") is None
+    assert await store.get("a") is not None
+    assert await store.get("c") is not None
+
+
+def test_create_agent_card_follows_external_url(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that the card URL is resolved per call while cards are shared per URL."""
+    monkeypatch.delenv(ENV_RENDER_EXTERNAL_URL, raising=False)
+    local_card = create_agent_card(9001)
+    assert local_card.url == "http://localhost:9001"
+    monkeypatch.setenv(ENV_RENDER_EXTERNAL_URL, "https://agents.example.com/balance")
+    assert create_agent_card(9001).url == "https://agents.example.com/balance"
+    monkeypatch.delenv(ENV_RENDER_EXTERNAL_URL)
+    assert create_agent_card(9001) is local_card
+
+
+def agent_run(tool_reply: str, answer: str) -> dict[str, list[Any]]:
+    """Build an agent result for a run with one balance tool call."""
+    return {
+        "messages": [
+            HumanMessage("what is my USDC balance?"),
+            AIMessage(
+                "",
+                tool_calls=[
+                    {"name": "get_token_balance", "args": {"token": "USDC"}, "id": "call_1"}
+                ],
+            ),
+            ToolMessage(tool_reply, tool_call_id="call_1"),
+            AIMessage(answer),
+        ]
+    }
+
+
+@pytest.fixture
+def balance_agent(monkeypatch: pytest.MonkeyPatch) -> BalanceAgent:
+    """Build a BalanceAgent with the response cache enabled."""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.delenv("BALANCE_RESPONSE_CACHE_TTL", raising=False)
+    return BalanceAgent()
+
+
+@pytest.mark.parametrize(
+    ("tool_reply", "cached"),
+    [
+        ("0xabc has 5.000000 USDC (USD Coin) on Cronos", True),
+        (f"{TOOL_ERROR_PREFIX}Request error: connection reset", False),
+        (f"0xabc has 5.000000 USDC (USD Coin) on Cronos ({STALE_BALANCE_NOTE})", False),
+    ],
+)
+async def test_invoke_caches_only_runs_with_fresh_tool_results(
+    balance_agent: BalanceAgent, monkeypatch: pytest.MonkeyPatch, tool_reply: str, cached: bool
+) -> None:
+    """Test that replies built on failed or stale tool results are not cached."""
+    runs: list[str] = []
+
+    async def fake_invoke_agent(query: str, session_id: str) -> dict[str, list[Any]]:
+        runs.append(query)
+        return agent_run(tool_reply, "Here is what I found.")
+
+    monkeypatch.setattr(balance_agent, "_invoke_agent", fake_invoke_agent)
+    first = await balance_agent.invoke("what is my USDC balance?", "session-1")
+    second = await balance_agent.invoke("what is my USDC balance?", "session-1")
+    # The LLM turns a tool failure into a normal reply, so the envelope reports success
+    assert orjson.loads(first)["success"] is True
+    assert second == first
+    assert len(runs) == (1 if cached else 2)
+
+
+@pytest.fixture
+def http_server() -> Iterator[str]:
+    """Serve "ok" over keep-alive HTTP/1.1 on localhost; yields the server URL."""
+
+    class OkHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self) -> None:
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"ok")
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OkHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+def test_openai_client_works_across_app_lifespans(
+    http_server: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that each lifespan's agent has a usable client and shutdown closes it."""
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    from app.main import app
+
+    async def fetch_with_agent_client() -> str:
+        response = await get_balance_agent()._http_client.get(http_server)
+        return response.text
+
+    clients = []
+    # Every TestClient runs the app on a new event loop, like a restarted server
+    for _ in range(2):
+        with TestClient(app) as client:
+            assert client.portal.call(fetch_with_agent_client) == "ok"
+            clients.append(get_balance_agent()._http_client)
+    assert clients[0] is not clients[1]
+    assert all(client.is_closed for client in clients)
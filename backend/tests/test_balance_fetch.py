@@ -0,0 +1,469 @@
+"""Tests for the balance agent's Bitquery fetch path and balance tools."""
+
+import asyncio
+import re
+from collections.abc import AsyncIterator
+from types import SimpleNamespace
+from typing import Any
+
+import aiohttp
+import orjson
+import pytest
+
+from app.agents.balance import agent
+
+ADDRESS = "0x742d35Cc6634C0532925a3b844Bc9e7595f0bEb"
+OTHER_ADDRESS = "0x0000000000000000000000000000000000000001"
+EMPTY_ADDRESS = "0x0000000000000000000000000000000000000002"
+
+CURRENCY_FIELDS_PATTERN = re.compile(r"currency \{([^}]*)\}")
+
+
+def make_token(name: str, symbol: str, value: str, decimals: int = 6) -> dict[str, Any]:
+    """Build a Bitquery token balance entry with every currency field present."""
+    return {
+        "currency": {
+            "name": name,
+            "symbol": symbol,
+            "decimals": decimals,
+            "address": f"0x{symbol.lower()}",
+        },
+        "value": value,
+    }
+
+
+class FakeBitquery:
+    """Stand-in for _query_bitquery that answers from in-memory wallets.
+
+    Only the currency fields selected by the query are returned, so field masks
+    behave as they would against the real API.
+    """
+
+    def __init__(self, wallets: dict[str, dict[str, Any]]):
+        self.wallets = {address.lower(): wallet for address, wallet in wallets.items()}
+        self.requests: list[dict[str, Any]] = []
+        self.error: str | None = None
+        # Addresses Bitquery rejects with a GraphQL error on their own field
+        self.failing: set[str] = set()
+
+    async def __call__(self, payload: bytes, allow_partial: bool = False) -> dict[str, Any]:
+        request = orjson.loads(payload)
+        self.requests.append(request)
+        # Yield like a real request so concurrent callers can pile up
+        await asyncio.sleep(0)
+        if self.error is not None:
+            return {"success": False, "error": self.error}
+        fields = CURRENCY_FIELDS_PATTERN.search(request["query"]).group(1).split()
+        variables = request["variables"]
+        if "address" in variables:
+            variables = {"ethereum": variables["address"]}
+        data: dict[str, Any] = {}
+        errors = []
+        for alias, address in variables.items():
+            if address.lower() in self.failing:
+                data[alias] = None
+                errors.append({"message": "invalid address", "path": [alias, "address"]})
+            else:
+                data[alias] = self._address_field(address, fields)
+        if errors and not (allow_partial and any(data.values())):
+            return {"success": False, "error": f"GraphQL errors: {orjson.dumps(errors).decode()}"}
+        response = {"data": data, "errors": errors} if errors else {"data": data}
+        return {"success": True, "data": response}
+
+    def _address_field(self, address: str, fields: list[str]) -> dict[str, Any]:
+        wallet = self.wallets.get(address.lower())
+        if wallet is None:
+            return {"address": []}
+        balances = [
+            {
+                "currency": {k: v for k, v in balance["currency"].items() if k in fields},
+                "value": balance["value"],
+            }
+            for balance in wallet["balances"]
+        ]
+        return {"address": [{"balance": wallet["balance"], "balances": balances}]}
+
+    @property
+    def queried_addresses(self) -> list[list[str]]:
+        """Addresses sent in each request, in request order."""
+        return [list(request["variables"].values()) for request in self.requests]
+
+
+@pytest.fixture(autouse=True)
+async def fresh_fetch_state(monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[None]:
+    """Give every test empty caches, a closed circuit and its own batcher."""
+    batcher = agent.BalanceBatcher()
+    monkeypatch.setattr(agent, "_balance_batcher", batcher)
+    monkeypatch.setattr(agent, "_bitquery_breaker", agent.CircuitBreaker())
+    agent._balances_cache.clear()
+    agent._stale_balances.clear()
+    agent._inflight_fetches.clear()
+    yield
+    await batcher.close()
+
+
+@pytest.fixture
+def bitquery(monkeypatch: pytest.MonkeyPatch) -> FakeBitquery:
+    """Patch Bitquery with a fake holding a wallet with a real and a test USDC."""
+    fake = FakeBitquery(
+        {
+            ADDRESS: {
+                "balance": "1.5",
+                "balances": [
+                    make_token("Test USDC", "USDC", "900000000"),
+                    make_token("USD Coin", "USDC", "5000000"),
+                ],
+            },
+            OTHER_ADDRESS: {
+                "balance": "0",
+                "balances": [
+                    make_token("Tether USD", "USDT", "7000000"),
+                    make_token("tBTC v2", "tBTC", "1000000000000000000", decimals=18),
+                ],
+            },
+        }
+    )
+    monkeypatch.setattr(agent, "_query_bitquery", fake)
+    return fake
+
+
+async def test_token_balance_skips_test_tokens(bitquery: FakeBitquery) -> None:
+    """Test that single-token lookups filter test tokens the same way get_balance does."""
+    reply = await agent.get_token_balance.ainvoke(
+        {"address": ADDRESS, "token": "USDC", "network": "cronos"}
+    )
+    assert reply == f"{ADDRESS} has 5.000000 USDC (USD Coin) on Cronos"
+    full_reply = await agent.get_balance.ainvoke({"address": ADDRESS, "network": "cronos"})
+    assert "Test USDC" not in full_reply
+    assert "USD Coin" in full_reply
+
+
+def symbols(result: dict[str, Any]) -> list[str]:
+    """Symbols of a balance result, in display order."""
+    return [balance["symbol"] for balance in result["balances"]]
+
+
+def test_build_batch_balances_query_aliases_each_address() -> None:
+    """Test that every address gets its own aliased root field and variable."""
+    query = agent.build_batch_balances_query(2)
+    assert "GetCronosBalancesBatch($a0: String!, $a1: String!)" in query
+    assert "a0: ethereum(network: cronos)" in query
+    assert "address(address: {is: $a1})" in query
+    assert agent.BALANCE_FIELDS in query
+
+
+async def test_concurrent_lookups_share_one_request(bitquery: FakeBitquery) -> None:
+    """Test that lookups in one batch window become one POST split back by alias."""
+    first, second, empty = await asyncio.gather(
+        agent.fetch_cronos_balances(ADDRESS),
+        agent.fetch_cronos_balances(OTHER_ADDRESS),
+        agent.fetch_cronos_balances(EMPTY_ADDRESS),
+    )
+    assert bitquery.queried_addresses == [[ADDRESS, OTHER_ADDRESS, EMPTY_ADDRESS]]
+    assert first["address"] == ADDRESS
+    assert symbols(first) == ["CRO", "USDC"]
+    assert second["address"] == OTHER_ADDRESS
+    assert symbols(second) == ["CRO", "tBTC", "USDT"]
+    assert symbols(empty) == ["CRO"]
+
+
+async def test_batches_are_capped_at_max_size(
+    bitquery: FakeBitquery, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a window with more lookups than max_size is split into several batches."""
+    monkeypatch.setattr(agent, "_balance_batcher", agent.BalanceBatcher(max_size=2))
+    try:
+        await asyncio.gather(
+            agent.fetch_cronos_balances(ADDRESS),
+            agent.fetch_cronos_balances(OTHER_ADDRESS),
+            agent.fetch_cronos_balances(EMPTY_ADDRESS),
+        )
+    finally:
+        await agent._balance_batcher.close()
+    assert bitquery.queried_addresses == [[ADDRESS, OTHER_ADDRESS], [EMPTY_ADDRESS]]
+
+
+async def test_batch_error_fails_only_its_own_address(bitquery: FakeBitquery) -> None:
+    """Test that a GraphQL error on one alias does not fail the rest of the batch."""
+    bitquery.failing.add(OTHER_ADDRESS.lower())
+    first, second, empty = await asyncio.gather(
+        agent.fetch_cronos_balances(ADDRESS),
+        agent.fetch_cronos_balances(OTHER_ADDRESS),
+        agent.fetch_cronos_balances(EMPTY_ADDRESS),
+    )
+    assert len(bitquery.requests) == 1
+    assert symbols(first) == ["CRO", "USDC"]
+    assert symbols(empty) == ["CRO"]
+    assert not second["success"]
+    assert second["error"] == (
+        'GraphQL errors: [{"message":"invalid address","path":["a1","address"]}]'
+    )
+
+
+async def test_batch_request_error_reaches_every_caller(bitquery: FakeBitquery) -> None:
+    """Test that a batch request failing as a whole resolves every lookup with the error."""
+    bitquery.error = "Unauthorized"
+    results = await asyncio.gather(
+        agent.fetch_cronos_balances(ADDRESS),
+        agent.fetch_cronos_balances(OTHER_ADDRESS),
+    )
+    assert len(bitquery.requests) == 1
+    assert [result["error"] for result in results] == ["Unauthorized"] * 2
+
+
+async def test_batch_network_error_reaches_every_caller(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that a request error during a batch is reported to every caller."""
+
+    async def failing_query(payload: bytes, allow_partial: bool = False) -> dict[str, Any]:
+        raise aiohttp.ClientConnectionError("connection reset")
+
+    monkeypatch.setattr(agent, "_query_bitquery", failing_query)
+    results = await asyncio.gather(
+        agent.fetch_cronos_balances(ADDRESS),
+        agent.fetch_cronos_balances(OTHER_ADDRESS),
+    )
+    assert [result["error"] for result in results] == ["Request error: connection reset"] * 2
+
+
+async def test_batcher_exception_fails_every_future(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that an exception escaping a batch is raised to every waiting caller."""
+
+    async def broken_batch(addresses: list[str]) -> dict[str, Any]:
+        raise RuntimeError("batch failed")
+
+    monkeypatch.setattr(agent, "batch_fetch_cronos_balances", broken_batch)
+    results = await asyncio.gather(
+        agent._balance_batcher.fetch(ADDRESS),
+        agent._balance_batcher.fetch(OTHER_ADDRESS),
+        return_exceptions=True,
+    )
+    assert [str(result) for result in results] == ["batch failed"] * 2
+
+
+async def test_batcher_close_stops_worker_and_cancels_waiting_lookups(
+    bitquery: FakeBitquery,
+) -> None:
+    """Test that close() stops the worker and cancels lookups not yet sent."""
+    batcher = agent.BalanceBatcher(window=60)
+    lookup = asyncio.create_task(batcher.fetch(ADDRESS))
+    await asyncio.sleep(0.01)
+    worker = batcher._worker
+    await batcher.close()
+    assert worker.done()
+    with pytest.raises(asyncio.CancelledError):
+        await lookup
+    assert bitquery.requests == []
+
+
+def test_circuit_opens_after_fail_max_failures() -> None:
+    """Test that the breaker refuses requests once fail_max failures in a row occur."""
+    breaker = agent.CircuitBreaker(fail_max=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert not breaker.allow_request()
+
+
+def test_half_open_circuit_lets_one_trial_through(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that after reset_timeout exactly one trial request is allowed."""
+    now = [100.0]
+    monkeypatch.setattr(agent, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    breaker = agent.CircuitBreaker(fail_max=1, reset_timeout=30)
+    breaker.record_failure()
+    assert not breaker.allow_request()
+    now[0] += 30
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    # A failed trial keeps the circuit open for another reset_timeout
+    breaker.record_failure()
+    now[0] += 29
+    assert not breaker.allow_request()
+    now[0] += 1
+    assert breaker.allow_request()
+    breaker.record_success()
+    assert breaker.allow_request()
+    assert breaker.allow_request()
+
+
+@pytest.fixture
+def bitquery_endpoint(monkeypatch: pytest.MonkeyPatch) -> list[Any]:
+    """Patch the Bitquery endpoint and POST; returns a list of queued POST outcomes.
+
+    Each outcome is either an exception to raise or a (status, content type, body) tuple.
+    """
+    outcomes: list[Any] = []
+
+    async def fake_post(
+        api_url: str, payload: bytes, headers: dict[str, str]
+    ) -> tuple[int, str, bytes]:
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    monkeypatch.setattr(agent, "get_bitquery_endpoint", lambda: ("https://bitquery.test", {}))
+    monkeypatch.setattr(agent, "_post_bitquery", fake_post)
+    return outcomes
+
+
+async def test_query_fails_fast_while_circuit_is_open(
+    bitquery_endpoint: list[Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that after fail_max outages Bitquery is not called until the circuit resets."""
+    monkeypatch.setattr(agent, "_bitquery_breaker", agent.CircuitBreaker(fail_max=2))
+    bitquery_endpoint.extend([aiohttp.ClientConnectionError("down")] * 2)
+    for _ in range(2):
+        with pytest.raises(aiohttp.ClientConnectionError):
+            await agent._query_bitquery(b"{}")
+    result = await agent._query_bitquery(b"{}")
+    assert result == {"success": False, "error": agent.BITQUERY_UNAVAILABLE_MESSAGE}
+    assert bitquery_endpoint == []
+
+
+class FailingSession:
+    """Stand-in for the aiohttp session whose every POST raises ``error``."""
+
+    def __init__(self, error: Exception):
+        self.error = error
+        self.posts = 0
+
+    def post(self, *args: Any, **kwargs: Any) -> Any:
+        self.posts += 1
+        raise self.error
+
+
+@pytest.mark.parametrize(
+    ("error", "posts"),
+    [
+        (aiohttp.SocketTimeoutError("read timed out"), 1),
+        (aiohttp.ConnectionTimeoutError("connect timed out"), 1),
+        (aiohttp.ServerDisconnectedError(), agent.BITQUERY_MAX_RETRIES + 1),
+    ],
+)
+async def test_post_retries_dropped_connections_but_not_timeouts(
+    error: Exception, posts: int, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that a hung Bitquery fails after one timeout while resets are retried."""
+    session = FailingSession(error)
+    monkeypatch.setattr(agent, "get_http_session", lambda: session)
+    monkeypatch.setattr(agent, "BITQUERY_RETRY_BACKOFF", 0)
+    with pytest.raises(type(error)):
+        await agent._post_bitquery("https://bitquery.test", b"{}", {})
+    assert session.posts == posts
+
+
+@pytest.mark.parametrize("status", [401, 403])
+async def test_auth_errors_do_not_trip_the_circuit(
+    status: int, bitquery_endpoint: list[Any], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test that 401/403 answers count as Bitquery being up and reset the failure count."""
+    monkeypatch.setattr(agent, "_bitquery_breaker", agent.CircuitBreaker(fail_max=2))
+    bitquery_endpoint.extend(
+        [
+            aiohttp.ClientConnectionError("down"),
+            (status, "application/json", b'{"message": "bad key"}'),
+            aiohttp.ClientConnectionError("down"),
+        ]
+    )
+    with pytest.raises(aiohttp.ClientConnectionError):
+        await agent._query_bitquery(b"{}")
+    result = await agent._query_bitquery(b"{}")
+    assert not result["success"]
+    assert result["error"].endswith(" Details: bad key")
+    with pytest.raises(aiohttp.ClientConnectionError):
+        await agent._query_bitquery(b"{}")
+    assert agent._bitquery_breaker.allow_request()
+
+
+@pytest.mark.parametrize(
+    ("error", "first_ok"),
+    [
+        ({"message": "invalid address", "path": ["a1", "address"]}, True),
+        ({"message": "query too complex"}, False),
+    ],
+)
+async def test_batch_keeps_data_for_addresses_without_errors(
+    error: dict[str, Any], first_ok: bool, bitquery_endpoint: list[Any]
+) -> None:
+    """Test that partial batch data is used unless an error cannot be tied to an alias."""
+    body = {"data": {"a0": {"address": []}, "a1": None}, "errors": [error]}
+    bitquery_endpoint.append((200, "application/json", orjson.dumps(body)))
+    results = await agent.batch_fetch_cronos_balances([ADDRESS, "0x1234"])
+    assert results[ADDRESS]["success"] is first_ok
+    assert not results["0x1234"]["success"]
+    assert results["0x1234"]["error"] == f"GraphQL errors: {orjson.dumps([error]).decode()}"
+
+
+async def test_stale_snapshot_served_when_refresh_fails(bitquery: FakeBitquery) -> None:
+    """Test that a failed refresh returns the last snapshot marked stale in both tools."""
+    fresh = await agent.fetch_cronos_balances(ADDRESS)
+    assert "stale" not in fresh
+    agent._balances_cache.clear()
+    bitquery.error = agent.BITQUERY_UNAVAILABLE_MESSAGE
+
+    stale = await agent.fetch_cronos_balances(ADDRESS)
+    assert stale["stale"] is True
+    assert stale["balances"] == fresh["balances"]
+
+    balance_reply = await agent.get_balance.ainvoke({"address": ADDRESS, "network": "cronos"})
+    assert agent.STALE_BALANCE_NOTE in balance_reply
+    token_reply = await agent.get_token_balance.ainvoke(
+        {"address": ADDRESS, "token": "USDC", "network": "cronos"}
+    )
+    assert token_reply.startswith(f"{ADDRESS} has 5.000000 USDC (USD Coin) on Cronos")
+    assert agent.STALE_BALANCE_NOTE in token_reply
+
+
+async def test_error_returned_without_stale_snapshot(bitquery: FakeBitquery) -> None:
+    """Test that a failure with nothing cached is reported as an error."""
+    bitquery.error = agent.BITQUERY_UNAVAILABLE_MESSAGE
+    result = await agent.fetch_cronos_balances(ADDRESS)
+    assert result["success"] is False
+    assert result["error"] == agent.BITQUERY_UNAVAILABLE_MESSAGE
+
+
+async def test_concurrent_same_address_lookups_share_one_fetch(bitquery: FakeBitquery) -> None:
+    """Test that concurrent lookups for one address, in any case, reuse the in-flight fetch."""
+    results = await asyncio.gather(
+        agent.fetch_cronos_balances(ADDRESS),
+        agent.fetch_cronos_balances(ADDRESS.lower()),
+    )
+    assert bitquery.queried_addresses == [[ADDRESS]]
+    assert results[0] is results[1]
+    # Later lookups are served from the cache
+    await agent.fetch_cronos_balances(ADDRESS.lower())
+    assert len(bitquery.requests) == 1
+
+
+async def test_token_and_full_lookups_share_one_request(bitquery: FakeBitquery) -> None:
+    """Test that concurrent get_token_balance and get_balance calls send one request."""
+    token_reply, balance_reply = await asyncio.gather(
+        agent.get_token_balance.ainvoke({"address": ADDRESS, "token": "USDC", "network": "cronos"}),
+        agent.get_balance.ainvoke({"address": ADDRESS, "network": "cronos"}),
+    )
+    assert bitquery.queried_addresses == [[ADDRESS]]
+    assert token_reply == f"{ADDRESS} has 5.000000 USDC (USD Coin) on Cronos"
+    assert "0xusdc" in balance_reply
+
+
+async def test_cancelled_caller_does_not_cancel_shared_fetch(bitquery: FakeBitquery) -> None:
+    """Test that cancelling one waiter leaves the shared fetch running for the others."""
+    cancelled = asyncio.create_task(agent.fetch_cronos_balances(ADDRESS))
+    waiting = asyncio.create_task(agent.fetch_cronos_balances(ADDRESS))
+    await asyncio.sleep(0)
+    cancelled.cancel()
+    result = await waiting
+    assert cancelled.cancelled()
+    assert result["success"] is True
+    assert len(bitquery.requests) == 1
+    assert agent._balances_cache[ADDRESS.lower()] is result
+    assert agent._inflight_fetches == {}
+
+
+async def test_lowercase_t_prefixed_tokens_are_reported(bitquery: FakeBitquery) -> None:
+    """Test that real tokens with a "t" prefix such as tBTC are not filtered as test tokens."""
+    reply = await agent.get_token_balance.ainvoke(
+        {"address": OTHER_ADDRESS, "token": "tBTC", "network": "cronos"}
+    )
+    assert reply == f"{OTHER_ADDRESS} has 1.000000 TBTC (tBTC v2) on Cronos"
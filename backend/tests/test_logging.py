@@ -0,0 +1,57 @@
+"""Tests for application logging setup."""
+
+import logging
+import logging.handlers
+import threading
+from collections.abc import Iterator
+
+import pytest
+
+from app.logging_config import queued_logging
+
+
+class RecordingHandler(logging.Handler):
+    """Handler collecting emitted messages with the thread that emitted them."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.records: list[tuple[str, str]] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append((record.getMessage(), threading.current_thread().name))
+
+
+@pytest.fixture
+def root_handler() -> Iterator[RecordingHandler]:
+    """Install a recording handler as the root logger's only handler."""
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    handler = RecordingHandler()
+    root.handlers = [handler]
+    yield handler
+    root.handlers = saved_handlers
+    root.setLevel(saved_level)
+
+
+def test_queued_logging_uses_existing_handlers_off_thread(root_handler: RecordingHandler) -> None:
+    """Test that existing root handlers keep receiving records, on the listener thread."""
+    with queued_logging():
+        root = logging.getLogger()
+        assert len(root.handlers) == 1
+        assert isinstance(root.handlers[0], logging.handlers.QueueHandler)
+        logging.getLogger("app.test").warning("queued %s", "record")
+    assert root_handler.records[0][0] == "queued record"
+    assert root_handler.records[0][1] != threading.current_thread().name
+
+
+def test_queued_logging_restores_handlers_on_exit(root_handler: RecordingHandler) -> None:
+    """Test that the previous handlers and level are restored after shutdown."""
+    root = logging.getLogger()
+    root.setLevel(logging.ERROR)
+    previous_handlers = root.handlers[:]
+    with queued_logging():
+        pass
+    assert root.handlers == previous_handlers
+    assert root.level == logging.ERROR
+    logging.getLogger("app.test").error("after shutdown")
+    assert root_handler.records == [("after shutdown", threading.current_thread().name)]